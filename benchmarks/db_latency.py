@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiosqlite
+
+import database as db
+from services.gift_parser import GiftRecord
+
+
+async def legacy_is_user_blocked(user_id: int) -> bool:
+    async with aiosqlite.connect(db.DB_FILE) as conn:
+        async with conn.execute("SELECT 1 FROM blocked_users WHERE user_id = ?", (user_id,)) as cursor:
+            return await cursor.fetchone() is not None
+
+
+async def legacy_save_gift_page(slug: str, number: int, record: GiftRecord):
+    async with aiosqlite.connect(db.DB_FILE) as conn:
+        await conn.execute(
+            "INSERT OR REPLACE INTO gift_pages (slug, number, status, owner, model, backdrop, symbol, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (slug, number, 200, record.owner, record.model, record.backdrop, record.symbol, time.time())
+        )
+        await conn.commit()
+
+
+async def measure(call, count: int) -> list[float]:
+    timings = []
+    for i in range(count):
+        started = time.perf_counter()
+        await call(i)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{name:<40} среднее {statistics.mean(timings) * 1e6:9.1f} мкс   p95 {p95 * 1e6:9.1f} мкс")
+
+
+async def run(count: int):
+    record = GiftRecord("https://t.me/nft/Bench-1", "@owner", "Model", "Backdrop", "Symbol")
+    await db.init_db()
+    try:
+        await run_queries(count, record)
+    finally:
+        await db.close_db()
+
+
+async def run_queries(count: int, record: GiftRecord):
+    await db.block_user(1)
+
+    report("чтение: соединение на каждый запрос", await measure(lambda i: legacy_is_user_blocked(i % 10), count))
+    report("чтение: общее соединение", await measure(lambda i: db.is_user_blocked(i % 10), count))
+    report("запись: соединение на каждый запрос", await measure(lambda i: legacy_save_gift_page("Legacy", i, record), count))
+    started = time.perf_counter()
+    report("запись: общее соединение, пачками", await measure(lambda i: db.save_gift_page("Batched", i, 200, record), count))
+    await db.flush_gift_pages()
+    print(f"{'':<40} вместе с финальным сбросом: {(time.perf_counter() - started) / count * 1e6:.1f} мкс/запись")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка запросов к SQLite: соединение на вызов против общего")
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_FILE = os.path.join(tmp, "bench.db")
+        asyncio.run(run(args.count))
+
+
+if __name__ == "__main__":
+    main()
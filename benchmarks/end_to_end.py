@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+
+import config
+import database as db
+from benchmarks.fake_nft import add_server_arguments
+from services import gift_fetcher
+from services.gift_filter import GiftFilter
+from services.http_client import http_client
+from services.proxy_manager import proxy_manager
+from services.search_jobs import SearchJob, SearchScheduler
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_nft.py")
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(FAKE_SERVER)).stdout.strip()
+    except Exception:
+        return None
+
+
+def start_fake_server(args) -> tuple[subprocess.Popen, str, list[str]]:
+    command = [sys.executable, FAKE_SERVER]
+    for name in ("port", "latency_ms", "error_rate", "supply", "rate_limit", "hidden_rate", "proxies",
+                 "proxy_port", "proxy_latency_ms", "proxy_fail_rate"):
+        command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    proxies = []
+    for line in process.stdout:
+        if line.startswith("proxy "):
+            proxies.append(line.split()[1])
+        elif line.startswith("ready "):
+            return process, line.split()[1], proxies
+    raise RuntimeError("Тестовый сервер не запустился")
+
+
+async def run(args, base_url: str, proxies: list[str]) -> dict:
+    config.GIFT_BASE_URL = base_url
+    await db.init_db()
+    await http_client.start()
+    proxy_manager.set_proxies(proxies)
+
+    # Время разбора HTML считается отдельно: это процессорная часть конвейера.
+    parse_cpu = 0.0
+    extract_gift = gift_fetcher.extract_gift
+
+    def timed_extract(url: str, html_text: str):
+        nonlocal parse_cpu
+        started = time.process_time()
+        try:
+            return extract_gift(url, html_text)
+        finally:
+            parse_cpu += time.process_time() - started
+
+    gift_fetcher.extract_gift = timed_extract
+
+    latencies = []
+
+    async def fetch(slug: str, number: int):
+        started = time.perf_counter()
+        try:
+            return await gift_fetcher.parse_gift_data(slug, number)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    scheduler = SearchScheduler(
+        fetch=fetch,
+        concurrency=args.concurrency,
+        max_running_jobs=1,
+        max_queued_jobs=1,
+        user_concurrency=args.concurrency,
+        user_max_jobs=1,
+        checkpoint_interval=60.0,
+        progress_interval=60.0,
+    )
+    job = SearchJob(user_id=1, chat_id=1, gift_name="Plush Pepe", start_id=1, end_id=args.ids,
+                    gift_filter=GiftFilter(models=["Frog*", "Ninja Mike"]))
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    scheduler.start()
+    scheduler.submit(job)
+    await job.done.wait()
+    elapsed = time.perf_counter() - started
+    cpu_total = time.process_time() - cpu_started
+    await scheduler.stop()
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(base_url.rsplit("/nft", 1)[0] + "/stats") as response:
+            server = await response.json()
+
+    await http_client.close()
+    await db.close_db()
+    return {
+        "pages": job.stats.processed,
+        "found": len(job.found),
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(job.stats.processed / elapsed, 1),
+        "requests_per_s": round(server["requests"] / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "mean": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+        },
+        "cpu_s": {"total": round(cpu_total, 3), "parsing": round(parse_cpu, 3)},
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "final_fetch_limit": gift_fetcher.fetch_limiter.limit,
+        "server": server,
+    }
+
+
+def compare(result: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["result"]
+    print(f"\nСравнение с {baseline_path}:")
+    for key, path in (("страниц/сек", ("pages_per_s",)), ("p95, мс", ("latency_ms", "p95")),
+                      ("CPU разбора, сек", ("cpu_s", "parsing")), ("пик RSS, МБ", ("peak_rss_mb",))):
+        old, new = baseline, result
+        for part in path:
+            old, new = old[part], new[part]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  {key:<18} {old:>10} -> {new:<10} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк поиска на локальной замене t.me")
+    parser.add_argument("--ids", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--output", default="benchmark_result.json", help="куда записать результат в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    server, base_url, proxies = start_fake_server(args)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_FILE = os.path.join(tmp, "bench.db")
+            result = asyncio.run(run(args, base_url, proxies))
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {"revision": git_revision(), "created_at": time.time(), "params": vars(args), "result": result}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    latency = result["latency_ms"]
+    print(f"Страниц: {result['pages']} за {result['elapsed_s']} сек. ({result['pages_per_s']} стр/сек, "
+          f"{result['requests_per_s']} запросов/сек), найдено {result['found']}")
+    print(f"Задержка: p50 {latency['p50']} мс, p95 {latency['p95']} мс, p99 {latency['p99']} мс")
+    print(f"CPU: всего {result['cpu_s']['total']} сек., разбор HTML {result['cpu_s']['parsing']} сек.; "
+          f"пик RSS {result['peak_rss_mb']} МБ")
+    print(f"Сервер: {result['server']}")
+    print(f"Результат записан в {args.output}")
+    if args.baseline:
+        compare(result, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
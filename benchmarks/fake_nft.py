@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import ipaddress
+import os
+import random
+import struct
+import time
+from collections import deque
+
+from aiohttp import web
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "gift_page.html")
+MODELS = ["Ninja Mike", "Frogtor", "Pepe Gold", "Cyber Frog", "Sunny Pepe", "Pink Frog"]
+BACKDROPS = ["Black", "Red", "Blue", "Emerald", "Gold", "Ivory White"]
+SYMBOLS = ["Illuminati", "Stripes", "Star", "Crown", "Clover"]
+
+
+def load_template() -> tuple[str, str]:
+    page = open(FIXTURE, encoding="utf-8").read()
+    marker = page.find("tgme_gift_table")
+    start = page.rfind("<table", 0, marker)
+    end = page.find("</table>", marker) + len("</table>")
+    return page[:start], page[end:]
+
+
+def gift_table(number: int, hidden_rate: float) -> str:
+    rng = random.Random(number)
+    if rng.random() < hidden_rate:
+        owner = '<span class="tgme_gift_owner">Hidden</span>'
+    else:
+        owner = f'<a href="https://t.me/owner{number}"><span class="tgme_gift_owner">Owner {number}</span></a>'
+    return (
+        '<table class="tgme_gift_table">\n'
+        f'<tr><th>Owner</th><td>{owner}</td></tr>\n'
+        f'<tr><th>Model</th><td>{rng.choice(MODELS)} <mark>{rng.uniform(0.1, 3):.1f}%</mark></td></tr>\n'
+        f'<tr><th>Backdrop</th><td>{rng.choice(BACKDROPS)} <mark>{rng.uniform(0.1, 3):.1f}%</mark></td></tr>\n'
+        f'<tr><th>Symbol</th><td>{rng.choice(SYMBOLS)} <mark>{rng.uniform(0.1, 3):.1f}%</mark></td></tr>\n'
+        '</table>'
+    )
+
+
+class FakeNftServer:
+    def __init__(self, latency_ms: float, error_rate: float, supply: int, rate_limit: int, hidden_rate: float):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.supply = supply
+        self.rate_limit = rate_limit
+        self.hidden_rate = hidden_rate
+        self.prefix, self.suffix = load_template()
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "redirects": 0}
+        self._recent: deque[float] = deque()
+        self._rng = random.Random(1)
+
+    def _throttled(self) -> bool:
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+    async def gift_page(self, request: web.Request) -> web.Response:
+        self.counters["requests"] += 1
+        slug, _, number = request.match_info["name"].rpartition("-")
+        if self._throttled():
+            self.counters["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        await asyncio.sleep(self._rng.uniform(0.5, 1.5) * self.latency_ms / 1000)
+        if self._rng.random() < self.error_rate:
+            self.counters["errors"] += 1
+            return web.Response(status=502)
+        if not number.isdigit() or not 0 < int(number) <= self.supply:
+            self.counters["redirects"] += 1
+            raise web.HTTPFound(f"/nft/{slug}")
+        self.counters["ok"] += 1
+        body = self.prefix + gift_table(int(number), self.hidden_rate) + self.suffix
+        return web.Response(text=body, content_type="text/html")
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.counters)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/nft/{name}", self.gift_page)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+
+class FakeSocksProxy:
+    def __init__(self, login: str, password: str, latency_ms: float, fail_rate: float):
+        self.login = login
+        self.password = password
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self._rng = random.Random()
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> tuple[str, int] | None:
+        version, methods_count = await reader.readexactly(2)
+        methods = await reader.readexactly(methods_count)
+        if version != 5 or 2 not in methods:
+            writer.write(b"\x05\xff")
+            return None
+        writer.write(b"\x05\x02")
+        _, login_len = await reader.readexactly(2)
+        login = (await reader.readexactly(login_len)).decode()
+        password = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+        if (login, password) != (self.login, self.password):
+            writer.write(b"\x01\x01")
+            return None
+        writer.write(b"\x01\x00")
+
+        _, command, _, address_type = await reader.readexactly(4)
+        if address_type == 1:
+            host = str(ipaddress.IPv4Address(await reader.readexactly(4)))
+        elif address_type == 3:
+            host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+        else:
+            host = str(ipaddress.IPv6Address(await reader.readexactly(16)))
+        port = struct.unpack("!H", await reader.readexactly(2))[0]
+        if command != 1:
+            writer.write(b"\x05\x07\x00\x01" + bytes(6))
+            return None
+        return host, port
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            target = await self._handshake(reader, writer)
+            if target is None:
+                return
+            await asyncio.sleep(self.latency_ms / 1000)
+            if self._rng.random() < self.fail_rate:
+                writer.write(b"\x05\x05\x00\x01" + bytes(6))
+                return
+            upstream_reader, upstream_writer = await asyncio.open_connection(*target)
+            writer.write(b"\x05\x00\x00\x01" + bytes(6))
+            await asyncio.gather(self._pipe(reader, upstream_writer), self._pipe(upstream_reader, writer))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    server = FakeNftServer(args.latency_ms, args.error_rate, args.supply, args.rate_limit, args.hidden_rate)
+    runner = web.AppRunner(server.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    proxies = []
+    for i in range(args.proxies):
+        proxy = FakeSocksProxy("user", "pass", args.proxy_latency_ms, args.proxy_fail_rate)
+        port = args.proxy_port + i
+        proxies.append(await asyncio.start_server(proxy.handle, "127.0.0.1", port))
+        print(f"proxy 127.0.0.1:{port}:user:pass", flush=True)
+    print(f"ready http://127.0.0.1:{args.port}/nft", flush=True)
+    await asyncio.Event().wait()
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="доля ответов 502")
+    parser.add_argument("--supply", type=int, default=4000, help="номера больше тиража отвечают редиректом")
+    parser.add_argument("--rate-limit", type=int, default=0, help="запросов в секунду до ответов 429, 0 - без лимита")
+    parser.add_argument("--hidden-rate", type=float, default=0.05, help="доля подарков со скрытым владельцем")
+    parser.add_argument("--proxies", type=int, default=0, help="сколько локальных SOCKS5-прокси поднять")
+    parser.add_argument("--proxy-port", type=int, default=18100)
+    parser.add_argument("--proxy-latency-ms", type=float, default=5)
+    parser.add_argument("--proxy-fail-rate", type=float, default=0.0, help="доля соединений, которые прокси отклоняет")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная замена t.me/nft и SOCKS5-прокси для бенчмарков")
+    add_server_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
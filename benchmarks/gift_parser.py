@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from services.gift_parser import extract_gift
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "gift_page.html")
+URL = "https://t.me/nft/PlushPepe-1337"
+
+
+def parse_with_soup(html_text: str) -> tuple[str, str, str] | None:
+    soup = BeautifulSoup(html_text, "lxml")
+    owner_tag = soup.select_one('table.tgme_gift_table th:-soup-contains("Owner") + td a')
+    if owner_tag and owner_tag.get('href'):
+        return (URL, "@" + owner_tag['href'].replace('https://t.me/', ''), html_text)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Разбор страницы подарка: BeautifulSoup против extract_gift")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        html_text = f.read()
+
+    # Корректность разбора проверяют tests/test_gift_parser.py, здесь только замер скорости.
+    record = extract_gift(URL, html_text)
+    legacy = parse_with_soup(html_text)
+
+    soup_time = timeit.timeit(lambda: parse_with_soup(html_text), number=args.number) / args.number
+    fast_time = timeit.timeit(lambda: extract_gift(URL, html_text), number=args.number) / args.number
+
+    print(f"Страница: {len(html_text) / 1024:.1f} KB, повторов: {args.number}")
+    print(f"BeautifulSoup:  {soup_time * 1000:8.3f} мс/стр")
+    print(f"extract_gift:   {fast_time * 1000:8.3f} мс/стр")
+    print(f"Ускорение:      {soup_time / fast_time:8.1f}x")
+    print(f"Размер результата: {sys.getsizeof(legacy[2])} байт HTML против записи из {len(record.owner + record.model + record.backdrop + record.symbol)} символов")
+
+
+if __name__ == "__main__":
+    main()
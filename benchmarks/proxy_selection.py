@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.proxy_manager import ProxyManager
+
+
+class LegacyProxyManager:
+    def __init__(self, proxies: list[str], cooldown_seconds: float):
+        self.proxies = proxies
+        self.cooldown_seconds = cooldown_seconds
+        self.cooldowns = {}
+        self.current_index = 0
+        self._lock = asyncio.Lock()
+
+    async def get_proxy(self) -> str | None:
+        async with self._lock:
+            start_index = self.current_index
+            while True:
+                proxy = self.proxies[self.current_index]
+                if time.time() >= self.cooldowns.get(proxy, 0):
+                    self.current_index = (self.current_index + 1) % len(self.proxies)
+                    return proxy
+                self.current_index = (self.current_index + 1) % len(self.proxies)
+                if self.current_index == start_index:
+                    await asyncio.sleep(self.cooldown_seconds)
+
+    def report_success(self, proxy: str, latency: float):
+        pass
+
+    def report_failure(self, proxy: str):
+        self.cooldowns[proxy] = time.time() + self.cooldown_seconds
+
+
+async def drive(manager, callers: int, calls: int, failure_rate: float) -> float:
+    rng = random.Random(42)
+    callers = min(callers, calls)
+    per_caller = calls // callers
+    selection_time = 0.0
+
+    async def caller():
+        nonlocal selection_time
+        for _ in range(per_caller):
+            started = time.perf_counter()
+            proxy = await manager.get_proxy()
+            selection_time += time.perf_counter() - started
+            if rng.random() < failure_rate:
+                manager.report_failure(proxy)
+            else:
+                manager.report_success(proxy, rng.uniform(0.1, 2.0))
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(caller() for _ in range(callers)))
+    return selection_time / (per_caller * callers)
+
+
+async def wake_up_delay(manager, proxies: list[str], stagger: float) -> float:
+    # Прокси падают по очереди, затем все вызывающие ждут первый освободившийся.
+    for proxy in proxies:
+        await manager.get_proxy()
+        manager.report_failure(proxy)
+        await asyncio.sleep(stagger)
+    started = time.perf_counter()
+    await asyncio.gather(*(manager.get_proxy() for _ in range(50)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Цена выбора прокси и ожидание после кулдауна: круговой обход против кучи")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--callers", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--failure-rate", type=float, default=0.3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print("Цена одного выбора прокси (меньше - лучше):")
+    print(f"{'прокси':>8} {'старый, мкс':>12} {'новый, мкс':>12}")
+    for size in map(int, args.sizes.split(",")):
+        proxies = [f"10.0.{i // 250}.{i % 250}:1080:user:pass" for i in range(size)]
+
+        # Кулдаун длиннее замера: доля "отдыхающих" прокси растет, и старый обход становится все длиннее.
+        legacy = LegacyProxyManager(proxies, cooldown_seconds=3600)
+        heap_based = ProxyManager(cooldown_seconds=3600, max_cooldown_seconds=3600, proxy_concurrency=10)
+        heap_based.set_proxies(proxies)
+
+        # Чтобы старая реализация не ушла в сон на час, доля ошибок ограничена размером пула.
+        calls = min(args.calls, int(size / args.failure_rate * 0.9))
+        legacy_us = asyncio.run(drive(legacy, args.callers, calls, args.failure_rate)) * 1e6
+        heap_us = asyncio.run(drive(heap_based, args.callers, calls, args.failure_rate)) * 1e6
+        print(f"{size:>8} {legacy_us:>12.2f} {heap_us:>12.2f}")
+
+    proxies = [f"10.1.0.{i}:1080:user:pass" for i in range(4)]
+    legacy = LegacyProxyManager(proxies, cooldown_seconds=1.0)
+    heap_based = ProxyManager(cooldown_seconds=1, max_cooldown_seconds=1, proxy_concurrency=10)
+    heap_based.set_proxies(proxies)
+    legacy_wait = asyncio.run(wake_up_delay(legacy, proxies, stagger=0.2))
+    heap_wait = asyncio.run(wake_up_delay(heap_based, proxies, stagger=0.2))
+    print(f"\nВсе прокси на кулдауне (1 сек.), первый освобождается через ~0.2 сек.:")
+    print(f"старый: {legacy_wait:.2f} сек. ожидания, новый: {heap_wait:.2f} сек.")
+    print(
+        "\nКруговой обход выбирает прокси за O(1) в среднем, куча - за O(log n), поэтому сам выбор в новой версии\n"
+        "дороже и дорожает с ростом пула (единицы микросекунд против сотен миллисекунд на запрос к t.me).\n"
+        "Взамен куча выдает прокси пропорционально успешности и скорости, пропускает занятые\n"
+        "и будит ожидающих, как только освобождается первый прокси, а не через полный кулдаун."
+    )
+
+
+if __name__ == "__main__":
+    main()
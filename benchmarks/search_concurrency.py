@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.gift_filter import GiftFilter
+from services.gift_parser import GiftRecord
+from services.search_jobs import SearchJob, SearchScheduler
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def fake_fetch(num: int, args) -> tuple[str, str, str]:
+    await asyncio.sleep(random.uniform(args.latency_ms * 0.5, args.latency_ms * 1.5) / 1000)
+    # Как в исходном parse_gift_data: каждая страница с владельцем возвращается вместе с полным html_text,
+    # и у каждого ID это отдельная строка размером со страницу.
+    html_text = "x" * (args.page_kb * 1024)
+    return (f"https://t.me/nft/Bench-{num}", "@owner", html_text)
+
+
+async def run_legacy(args) -> int:
+    # aiohttp.ClientSession по умолчанию держит не больше 100 соединений, остальные задачи ждут в очереди коннектора.
+    connector_limit = asyncio.Semaphore(100)
+
+    async def fetch(num: int):
+        async with connector_limit:
+            return await fake_fetch(num, args)
+
+    tasks = [asyncio.create_task(fetch(num)) for num in range(1, args.ids + 1)]
+    processed = 0
+    for task in asyncio.as_completed(tasks):
+        await task
+        processed += 1
+    return processed
+
+
+async def run_pool(args) -> int:
+    async def fetch(slug: str, num: int):
+        # Пул разбирает страницу сразу и дальше держит только найденные атрибуты, HTML выбрасывается.
+        url, owner, _ = await fake_fetch(num, args)
+        return None if num % 7 else GiftRecord(url=url, owner=owner, model="Bench", backdrop="Black", symbol="Star")
+
+    scheduler = SearchScheduler(
+        fetch=fetch,
+        concurrency=args.concurrency,
+        max_running_jobs=1,
+        max_queued_jobs=1,
+        user_concurrency=args.concurrency,
+        user_max_jobs=1,
+        checkpoint_interval=60.0,
+        progress_interval=60.0,
+    )
+    scheduler.start()
+    job = SearchJob(user_id=1, chat_id=1, gift_name="Bench", start_id=1, end_id=args.ids, gift_filter=GiftFilter())
+    scheduler.submit(job)
+    await job.done.wait()
+    await scheduler.stop()
+    return job.stats.processed
+
+
+def run_single(args):
+    runner = run_legacy if args.mode == "legacy" else run_pool
+    started = time.perf_counter()
+    processed = asyncio.run(runner(args))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "mode": args.mode,
+        "ids": processed,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(processed / elapsed, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пиковая память и скорость: задача на каждый ID против пула воркеров")
+    parser.add_argument("--mode", choices=["legacy", "pool", "both"], default="both")
+    parser.add_argument("--ids", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--page-kb", type=int, default=100, help="размер страницы t.me/nft, около 100 КБ")
+    args = parser.parse_args()
+
+    if args.mode != "both":
+        run_single(args)
+        return
+
+    # Каждый режим в отдельном процессе, иначе ru_maxrss второго замера включает пик первого.
+    for mode in ("legacy", "pool"):
+        cmd = [sys.executable, __file__, "--mode", mode, "--ids", str(args.ids),
+               "--concurrency", str(args.concurrency), "--latency-ms", str(args.latency_ms),
+               "--page-kb", str(args.page_kb)]
+        subprocess.run(cmd, check=True)
+
+
+if __name__ == "__main__":
+    main()
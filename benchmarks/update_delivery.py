@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import web
+
+import config
+from services.webhook import build_webhook_app
+
+TOKEN = "42:BENCHMARK"
+SECRET = "benchmark-secret"
+
+
+def make_update(update_id: int) -> dict:
+    chat_id = 1000 + update_id % 50
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": "ping",
+        },
+    }
+
+
+def percentile(values: list[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class FakeBotApi:
+    # Минимальная замена api.telegram.org: getUpdates с долгим опросом и сетевой задержкой в каждую сторону.
+    def __init__(self, one_way: float):
+        self.one_way = one_way
+        self.pending: deque[dict] = deque()
+        self._arrived = asyncio.Event()
+        self.get_updates_calls = 0
+
+    def push(self, update: dict):
+        self.pending.append(update)
+        self._arrived.set()
+
+    async def _get_updates(self, params) -> list[dict]:
+        self.get_updates_calls += 1
+        offset = int(params.get("offset") or 0)
+        while self.pending and self.pending[0]["update_id"] < offset:
+            self.pending.popleft()
+        if not self.pending:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                pass
+        return list(self.pending)[:int(params.get("limit") or 100)]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await request.post()
+        await asyncio.sleep(self.one_way)
+        if method == "getMe":
+            result = {"id": 42, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method == "getUpdates":
+            result = await self._get_updates(params)
+        else:
+            result = True
+        await asyncio.sleep(self.one_way)
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start_app(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def make_dispatcher(created: dict[int, float], latencies: list[float], done: asyncio.Event, total: int) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        latencies.append(time.perf_counter() - created[message.message_id])
+        if len(latencies) == total:
+            done.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def post_updates(args, deliver, created: dict[int, float]):
+    tasks = set()
+    interval = 1 / args.rate if args.rate else 0.0
+    started = time.perf_counter()
+    for update_id in range(1, args.updates + 1):
+        if interval:
+            await asyncio.sleep(max(started + update_id * interval - time.perf_counter(), 0))
+        created[update_id] = time.perf_counter()
+        result = deliver(make_update(update_id))
+        if asyncio.iscoroutine(result):
+            task = asyncio.create_task(result)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def run_polling(args) -> dict:
+    api = FakeBotApi(args.network_ms / 2000)
+    api_runner = await start_app(api.app(), args.api_port)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{args.api_port}")))
+    created, latencies, done = {}, [], asyncio.Event()
+    dp = make_dispatcher(created, latencies, done, args.updates)
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=10))
+    await asyncio.sleep(0.5)
+
+    started = time.perf_counter()
+    await post_updates(args, api.push, created)
+    await asyncio.wait_for(done.wait(), timeout=60)
+    elapsed = time.perf_counter() - started
+
+    await dp.stop_polling()
+    await polling
+    await bot.session.close()
+    await api_runner.cleanup()
+    return {"latencies": latencies, "elapsed": elapsed, "requests": api.get_updates_calls}
+
+
+async def run_webhook(args) -> dict:
+    config.WEBHOOK_PATH = "/webhook"
+    bot = Bot(TOKEN)
+    created, latencies, done = {}, [], asyncio.Event()
+    dp = make_dispatcher(created, latencies, done, args.updates)
+    runner = await start_app(build_webhook_app(bot, dp, SECRET), args.webhook_port)
+    url = f"http://127.0.0.1:{args.webhook_port}/webhook"
+    one_way = args.network_ms / 2000
+
+    # Telegram держит к вебхуку не больше max_connections соединений (по умолчанию 40).
+    connections = asyncio.Semaphore(args.connections)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args.connections)) as session:
+        async def deliver(update: dict):
+            await asyncio.sleep(one_way)
+            async with connections:
+                async with session.post(url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as response:
+                    response.raise_for_status()
+
+        started = time.perf_counter()
+        await post_updates(args, deliver, created)
+        await asyncio.wait_for(done.wait(), timeout=60)
+        elapsed = time.perf_counter() - started
+
+        # Апдейт с чужим секретом должен отклоняться, не доходя до диспетчера.
+        rejected = 0
+        for update_id in range(args.updates + 1, args.updates + 11):
+            async with session.post(url, json=make_update(update_id),
+                                    headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}) as response:
+                rejected += response.status == 401
+        async with session.get(f"http://127.0.0.1:{args.webhook_port}/health") as response:
+            health = response.status
+
+    await runner.cleanup()
+    return {"latencies": latencies, "elapsed": elapsed, "requests": args.updates, "rejected": rejected,
+            "health": health}
+
+
+def report(name: str, result: dict):
+    latencies = result["latencies"]
+    print(f"{name}: {len(latencies)} апдейтов за {result['elapsed']:.2f} сек. "
+          f"({len(latencies) / result['elapsed']:.0f} апдейтов/сек, HTTP-запросов {result['requests']})")
+    print(f"  доставка: p50 {percentile(latencies, 0.5) * 1000:.1f} мс, p95 {percentile(latencies, 0.95) * 1000:.1f} мс, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} мс, среднее {statistics.mean(latencies) * 1000:.1f} мс")
+    if "health" in result:
+        print(f"  отклонено с неверным секретом: {result['rejected']} из 10, /health -> {result['health']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка и пропускная способность доставки апдейтов: polling против вебхука")
+    parser.add_argument("--mode", choices=["both", "polling", "webhook"], default="both")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200, help="апдейтов в секунду, 0 - сколько успеет")
+    parser.add_argument("--network-ms", type=float, default=40, help="RTT между ботом и Telegram")
+    parser.add_argument("--connections", type=int, default=40, help="max_connections вебхука")
+    parser.add_argument("--api-port", type=int, default=18200)
+    parser.add_argument("--webhook-port", type=int, default=18201)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.mode in ("both", "polling"):
+        report("Polling", asyncio.run(run_polling(args)))
+    if args.mode in ("both", "webhook"):
+        report("Вебхук", asyncio.run(run_webhook(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,62 @@
 BOT_TOKEN: str = "7597825864:AAE369Y4u7yPK7QRRg9IrZZJew2uLF2rGI8" # Замените в кавычках (ИХ НЕ СТИРАТЬ!) на свой токен
 
 OWNER_ID: int = 2098323557 #Замените циферки на свой ID 
+
+SEARCH_CONCURRENCY: int = 100 # Сколько страниц одновременно проверяется во всех поисках вместе
+SEARCH_MAX_RUNNING_JOBS: int = 3 # Сколько поисков выполняется одновременно, остальные ждут в очереди
+SEARCH_MAX_QUEUED_JOBS: int = 50 # Максимальная длина очереди поисков
+USER_SEARCH_CONCURRENCY: int = 50 # Сколько страниц одновременно может проверяться для одного пользователя (с воркерами - та же доля от SHARDS_IN_FLIGHT)
+USER_MAX_SEARCHES: int = 1 # Сколько поисков (в очереди и в работе) может быть у одного пользователя
+SEARCH_CHECKPOINT_INTERVAL: float = 5.0 # Как часто (в секундах) сохранять прогресс поисков в БД
+SEARCH_PROGRESS_INTERVAL: float = 3.0 # Не чаще скольких секунд обновлять сообщение о прогрессе поиска
+SEARCH_WORKERS: int = 0 # Сколько локальных процессов-воркеров запускать для проверки страниц, 0 - проверяет сам бот
+SEARCH_REMOTE_WORKERS: bool = False # Принимать воркеров с других машин (python worker.py --broker http://адрес:порт)
+SHARD_SIZE: int = 200 # Сколько номеров получает воркер за раз
+SHARDS_IN_FLIGHT: int = 8 # Сколько шардов одновременно ждут воркеров или находятся в работе
+SHARD_LEASE_TIMEOUT: float = 300.0 # Через сколько секунд шард отдается другому воркеру, если первый не ответил
+WORKER_BROKER_HOST: str = "127.0.0.1" # На каком адресе бот раздает шарды воркерам (0.0.0.0 для удаленных)
+WORKER_BROKER_PORT: int = 8081 # Порт раздачи шардов
+WORKER_TOKEN: str = "" # Общий секрет бота и воркеров; пустой - сгенерируется при запуске (только для локальных)
+PROXY_CONCURRENCY: int = 10 # Максимум одновременных запросов через один прокси
+PROXY_INITIAL_CONCURRENCY: int = 2 # С какой параллельности начинает новый прокси, дальше лимит подбирается сам
+FETCH_INITIAL_CONCURRENCY: int = 20 # Стартовый общий лимит запросов к t.me, дальше он подбирается сам до SEARCH_CONCURRENCY
+FETCH_MIN_CONCURRENCY: int = 2 # Ниже этого общий лимит не опускается даже при сплошных ошибках
+FETCH_LATENCY_TARGET: float = 5.0 # Если ответ медленнее (в секундах), лимит перестает расти
+PROXY_COOLDOWN: int = 30 # Отдых прокси после первой ошибки, при повторных ошибках подряд время удваивается
+PROXY_MAX_COOLDOWN: int = 600 # Верхняя граница отдыха прокси в секундах
+GIFT_BASE_URL: str = "https://t.me/nft" # Откуда загружаются страницы подарков (бенчмарки подменяют на локальный сервер)
+GIFT_CACHE_TTL: int = 6 * 60 * 60 # Сколько секунд страница подарка считается свежей в кэше
+GIFT_CACHE_NEGATIVE_TTL: int = 60 * 60 # То же для несуществующих подарков и подарков со скрытым владельцем
+GIFT_SUPPLY_REFRESH_INTERVAL: int = 6 * 60 * 60 # Как часто (в секундах) заново определять тираж каждого подарка
+GIFT_SUPPLY_PROBE_CONCURRENCY: int = 4 # Сколько подарков одновременно проверяется при фоновом обновлении тиражей
+GIFT_SUPPLY_WAIT_TIMEOUT: float = 20.0 # Сколько секунд пользователь ждет определения тиража, прежде чем поиск пойдет без обрезки
+GIFT_INDEX_REQUESTS_PER_MINUTE: int = 300 # Сколько страниц в минуту фоновый индексатор обновляет, 0 - индексатор выключен
+GIFT_INDEX_CONCURRENCY: int = 10 # Сколько страниц индексатор загружает одновременно
+GIFT_INDEX_MAX_AGE: int = 12 * 60 * 60 # Насколько старые данные индекса (в секундах) можно отдавать вместо живого поиска
+HTTP_POOL_LIMIT: int = 100 # Максимум открытых соединений в пуле одного прокси
+HTTP_KEEPALIVE_TIMEOUT: float = 60.0 # Сколько секунд держать простаивающее соединение открытым
+HTTP_DNS_CACHE_TTL: int = 300 # Сколько секунд кэшировать DNS-ответы
+PROXY_PROBE_INTERVAL: int = 5 * 60 # Как часто (в секундах) фоном проверять все прокси
+PROXY_PROBE_CONCURRENCY: int = 20 # Сколько прокси проверяется одновременно
+PROXY_PROBE_TIMEOUT: float = 10.0 # Таймаут одной проверки прокси
+SUBSCRIPTION_CACHE_TTL: int = 10 * 60 # Сколько секунд помнить, что пользователь подписан на канал
+SUBSCRIPTION_NEGATIVE_CACHE_TTL: int = 15 # Сколько секунд помнить, что пользователь НЕ подписан
+SUBSCRIPTION_CACHE_SIZE: int = 50000 # Максимум пользователей в кэше подписок
+RESULT_STORE_SIZE: int = 1000 # Сколько последних результатов поиска держать в памяти
+RESULT_STORE_TTL: int = 24 * 60 * 60 # Сколько секунд результаты поиска доступны для листания
+TELEGRAM_GLOBAL_RATE: float = 25.0 # Сколько сообщений в секунду бот отправляет во все чаты вместе (лимит Telegram ~30)
+TELEGRAM_PRIVATE_CHAT_RATE: float = 1.0 # Сообщений в секунду в один личный чат
+TELEGRAM_GROUP_CHAT_RATE: float = 20 / 60 # Сообщений в секунду в одну группу (лимит Telegram 20 в минуту)
+TELEGRAM_MAX_RETRIES: int = 3 # Сколько раз повторять отправку после ответа Telegram "Too Many Requests"
+METRICS_ENABLED: bool = True # Собирать метрики задержек и счетчики (False - горячие пути их пропускают)
+METRICS_HOST: str = "127.0.0.1" # Адрес HTTP-эндпоинта /metrics в формате Prometheus
+METRICS_PORT: int = 9108 # Порт эндпоинтов /metrics и /health, 0 - не поднимать
+PROFILE_MAX_SECONDS: int = 300 # Максимальная длительность /profile
+PROFILE_SAMPLE_INTERVAL: float = 0.005 # Как часто профилировщик снимает стек потока цикла (сек.)
+PROFILE_BLOCK_THRESHOLD: float = 0.1 # С какой задержки цикла событий считать, что его что-то заблокировало (сек.)
+WEBHOOK_URL: str = "" # Публичный HTTPS-адрес бота для вебхука, например "https://bot.example.com". Пусто - long polling
+WEBHOOK_PATH: str = "/webhook" # Путь, на который Telegram присылает апдейты
+WEBHOOK_SECRET: str = "" # Секрет в заголовке X-Telegram-Bot-Api-Secret-Token. Пусто - генерируется при каждом запуске
+WEBHOOK_HOST: str = "0.0.0.0" # Адрес, на котором слушает сервер вебхука (там же /health, /metrics только на METRICS_HOST)
+WEBHOOK_PORT: int = 8080 # Порт сервера вебхука, за ним обычно стоит nginx с HTTPS
+PROXY_IMPORT_MAX_BYTES: int = 5 * 1024 * 1024 # Максимальный размер файла со списком прокси для /addproxy
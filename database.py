@@ -1,17 +1,116 @@
+import asyncio
+import contextlib
 import aiosqlite
 import logging
+import time
 
 DB_FILE = 'bot_database.db'
 
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=5000",
+)
+
+PROXY_STAT_COLUMNS = {
+    "latency_ms": "REAL",
+    "success_count": "INTEGER NOT NULL DEFAULT 0",
+    "failure_count": "INTEGER NOT NULL DEFAULT 0",
+    "last_checked": "REAL",
+}
+
+SEARCH_JOB_COLUMNS = {
+    "max_matches": "INTEGER",
+}
+
+GIFT_PAGE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_gift_pages_model ON gift_pages (slug, model COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_gift_pages_backdrop ON gift_pages (slug, backdrop COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_gift_pages_owner ON gift_pages (owner COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_gift_pages_fetched ON gift_pages (slug, fetched_at)",
+)
+
+GIFT_PAGES_BATCH_SIZE = 200
+GIFT_PAGES_FLUSH_INTERVAL = 1.0
+# Если база долго недоступна, буфер не растет бесконечно: сверх этого отбрасываются самые старые строки кэша.
+GIFT_PAGES_BUFFER_LIMIT = 50 * GIFT_PAGES_BATCH_SIZE
+
+_connection: aiosqlite.Connection | None = None
+_write_lock = asyncio.Lock()
+_gift_pages_buffer: list[tuple] = []
+_flush_task: asyncio.Task | None = None
+
+
+async def connect() -> aiosqlite.Connection:
+    global _connection
+    if _connection is None:
+        _connection = await aiosqlite.connect(DB_FILE)
+        for pragma in PRAGMAS:
+            await _connection.execute(pragma)
+    return _connection
+
+def _conn() -> aiosqlite.Connection:
+    if _connection is None:
+        raise RuntimeError("База данных не инициализирована, сначала вызовите init_db()")
+    return _connection
+
+@contextlib.asynccontextmanager
+async def transaction():
+    async with _write_lock:
+        conn = _conn()
+        try:
+            yield conn
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+
+async def execute(sql: str, params: tuple = ()) -> int:
+    async with transaction() as conn:
+        cursor = await conn.execute(sql, params)
+        return cursor.rowcount
+
+async def executemany(sql: str, rows: list[tuple]) -> int:
+    if not rows:
+        return 0
+    async with transaction() as conn:
+        cursor = await conn.executemany(sql, rows)
+        return cursor.rowcount
+
+async def fetchone(sql: str, params: tuple = ()) -> tuple | None:
+    async with _conn().execute(sql, params) as cursor:
+        return await cursor.fetchone()
+
+async def fetchall(sql: str, params: tuple = ()) -> list[tuple]:
+    async with _conn().execute(sql, params) as cursor:
+        return list(await cursor.fetchall())
+
+async def _flush_periodically():
+    while True:
+        await asyncio.sleep(GIFT_PAGES_FLUSH_INTERVAL)
+        await flush_gift_pages()
+
+async def _add_missing_columns(db: aiosqlite.Connection, table: str, columns: dict[str, str]):
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        existing = {row[1] for row in await cursor.fetchall()}
+    for column, definition in columns.items():
+        if column not in existing:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 async def init_db():
+    global _flush_task
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
+        await connect()
+        async with transaction() as db:
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS proxies (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     proxy_str TEXT NOT NULL UNIQUE
                 )
             ''')
+            await _add_missing_columns(db, "proxies", PROXY_STAT_COLUMNS)
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS settings (
                     key TEXT PRIMARY KEY,
@@ -28,111 +127,431 @@ async def init_db():
                     username TEXT PRIMARY KEY
                 )
             ''')
-            await db.commit()
-            logging.info("База данных успешно инициализирована.")
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS gift_pages (
+                    slug TEXT NOT NULL,
+                    number INTEGER NOT NULL,
+                    status INTEGER NOT NULL,
+                    owner TEXT,
+                    model TEXT,
+                    backdrop TEXT,
+                    symbol TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (slug, number)
+                )
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS search_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    chat_id INTEGER NOT NULL,
+                    gift_name TEXT NOT NULL,
+                    start_id INTEGER NOT NULL,
+                    end_id INTEGER NOT NULL,
+                    filters TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'active',
+                    processed BLOB,
+                    processed_count INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            await _add_missing_columns(db, "search_jobs", SEARCH_JOB_COLUMNS)
+            for index_sql in GIFT_PAGE_INDEXES:
+                await db.execute(index_sql)
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS gift_supply (
+                    slug TEXT PRIMARY KEY,
+                    supply INTEGER NOT NULL,
+                    checked_at REAL NOT NULL
+                )
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS scan_shards (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    slug TEXT NOT NULL,
+                    numbers TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    leased_until REAL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS search_matches (
+                    job_id INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    PRIMARY KEY (job_id, url)
+                )
+            ''')
+        if _flush_task is None:
+            _flush_task = asyncio.create_task(_flush_periodically())
+        logging.info("База данных успешно инициализирована.")
     except Exception as e:
         logging.error(f"Ошибка при инициализации БД: {e}")
 
+async def close_db():
+    global _connection, _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+    if _connection is not None:
+        await flush_gift_pages()
+        await _connection.close()
+        _connection = None
+        logging.info("Соединение с базой данных закрыто.")
+
 async def add_proxy(proxy_str: str) -> bool:
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("INSERT INTO proxies (proxy_str) VALUES (?)", (proxy_str,))
-            await db.commit()
-            return True
+        await execute("INSERT INTO proxies (proxy_str) VALUES (?)", (proxy_str,))
+        return True
     except aiosqlite.IntegrityError:
         return False
     except Exception as e:
         logging.error(f"Ошибка при добавлении прокси {proxy_str}: {e}")
         return False
 
+async def add_proxies(proxies: list[str], batch_size: int = 1000) -> list[str]:
+    # Возвращает только реально добавленные прокси, чтобы менеджер мог дописать их в память без перечитывания таблицы.
+    existing = set(await get_all_proxies())
+    new = [proxy for proxy in dict.fromkeys(proxies) if proxy not in existing]
+    try:
+        for i in range(0, len(new), batch_size):
+            await executemany("INSERT OR IGNORE INTO proxies (proxy_str) VALUES (?)", [(p,) for p in new[i:i + batch_size]])
+    except Exception as e:
+        logging.error(f"Ошибка при массовом добавлении прокси: {e}")
+        return new[:i]
+    return new
+
+async def delete_proxies(proxies: list[str]) -> int:
+    try:
+        return await executemany("DELETE FROM proxies WHERE proxy_str = ?", [(p,) for p in proxies])
+    except Exception as e:
+        logging.error(f"Ошибка при удалении прокси: {e}")
+        return 0
+
 async def delete_proxy(proxy_str: str) -> bool:
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("DELETE FROM proxies WHERE proxy_str = ?", (proxy_str,))
-            await db.commit()
-            return db.total_changes > 0
+        return await execute("DELETE FROM proxies WHERE proxy_str = ?", (proxy_str,)) > 0
     except Exception as e:
         logging.error(f"Ошибка при удалении прокси {proxy_str}: {e}")
         return False
 
 async def get_all_proxies() -> list[str]:
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            async with db.execute("SELECT proxy_str FROM proxies") as cursor:
-                return [row[0] for row in await cursor.fetchall()]
+        return [row[0] for row in await fetchall("SELECT proxy_str FROM proxies")]
     except Exception as e:
         logging.error(f"Ошибка при получении списка прокси: {e}")
         return []
 
+async def get_proxy_stats() -> list[tuple]:
+    try:
+        return await fetchall(
+            "SELECT proxy_str, latency_ms, success_count, failure_count, last_checked FROM proxies"
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при получении статистики прокси: {e}")
+        return []
+
+async def save_proxy_checks(results: list[tuple[str, float | None]]):
+    checked_at = time.time()
+    rows = [
+        (latency * 1000 if latency is not None else None, int(latency is not None), int(latency is None), checked_at, proxy_str)
+        for proxy_str, latency in results
+    ]
+    try:
+        await executemany(
+            "UPDATE proxies SET latency_ms = COALESCE(?, latency_ms), success_count = success_count + ?, "
+            "failure_count = failure_count + ?, last_checked = ? WHERE proxy_str = ?",
+            rows
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении результатов проверки прокси: {e}")
+
 async def set_subscription_channel(channel_username: str | None):
     key = "subscription_channel"
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            if channel_username:
-                await db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, channel_username))
-            else:
-                await db.execute("DELETE FROM settings WHERE key = ?", (key,))
-            await db.commit()
+        if channel_username:
+            await execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, channel_username))
+        else:
+            await execute("DELETE FROM settings WHERE key = ?", (key,))
     except Exception as e:
         logging.error(f"Ошибка при установке канала подписки: {e}")
 
 async def get_subscription_channel() -> str | None:
     key = "subscription_channel"
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            async with db.execute("SELECT value FROM settings WHERE key = ?", (key,)) as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result else None
+        result = await fetchone("SELECT value FROM settings WHERE key = ?", (key,))
+        return result[0] if result else None
     except Exception as e:
         logging.error(f"Ошибка при получении канала подписки: {e}")
         return None
 
 async def block_user(user_id: int):
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("INSERT OR IGNORE INTO blocked_users (user_id) VALUES (?)", (user_id,))
-            await db.commit()
+        await execute("INSERT OR IGNORE INTO blocked_users (user_id) VALUES (?)", (user_id,))
     except Exception as e:
         logging.error(f"Ошибка при блокировке пользователя {user_id}: {e}")
 
 async def unblock_user(user_id: int):
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
-            await db.commit()
+        await execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
     except Exception as e:
         logging.error(f"Ошибка при разблокировке пользователя {user_id}: {e}")
 
 async def is_user_blocked(user_id: int) -> bool:
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            async with db.execute("SELECT 1 FROM blocked_users WHERE user_id = ?", (user_id,)) as cursor:
-                return await cursor.fetchone() is not None
+        return await fetchone("SELECT 1 FROM blocked_users WHERE user_id = ?", (user_id,)) is not None
     except Exception as e:
         logging.error(f"Ошибка при проверке блокировки {user_id}: {e}")
         return False
 
+async def get_blocked_users() -> list[int]:
+    try:
+        return [row[0] for row in await fetchall("SELECT user_id FROM blocked_users")]
+    except Exception as e:
+        logging.error(f"Ошибка при получении списка заблокированных: {e}")
+        return []
+
 async def add_to_blacklist(username: str):
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("INSERT OR IGNORE INTO blacklist (username) VALUES (?)", (username.lower(),))
-            await db.commit()
+        await execute("INSERT OR IGNORE INTO blacklist (username) VALUES (?)", (username.lower(),))
     except Exception as e:
         logging.error(f"Ошибка при добавлении в ЧС {username}: {e}")
 
 async def remove_from_blacklist(username: str):
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("DELETE FROM blacklist WHERE username = ?", (username.lower(),))
-            await db.commit()
+        await execute("DELETE FROM blacklist WHERE username = ?", (username.lower(),))
     except Exception as e:
         logging.error(f"Ошибка при удалении из ЧС {username}: {e}")
 
 async def get_blacklist() -> list[str]:
     try:
-        async with aiosqlite.connect(DB_FILE) as db:
-            async with db.execute("SELECT username FROM blacklist") as cursor:
-                return [row[0] for row in await cursor.fetchall()]
+        return [row[0] for row in await fetchall("SELECT username FROM blacklist")]
     except Exception as e:
         logging.error(f"Ошибка при получении ЧС: {e}")
-        return []
\ No newline at end of file
+        return []
+
+async def get_gift_page(slug: str, number: int, ttl: int, negative_ttl: int) -> tuple | None:
+    now = time.time()
+    try:
+        return await fetchone(
+            "SELECT owner, model, backdrop, symbol FROM gift_pages "
+            "WHERE slug = ? AND number = ? AND fetched_at >= CASE WHEN owner IS NULL THEN ? ELSE ? END",
+            (slug, number, now - negative_ttl, now - ttl)
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при чтении кэша страницы {slug}-{number}: {e}")
+        return None
+
+async def get_gift_page_status(slug: str, number: int, ttl: int, negative_ttl: int) -> int | None:
+    now = time.time()
+    try:
+        row = await fetchone(
+            "SELECT status FROM gift_pages "
+            "WHERE slug = ? AND number = ? AND fetched_at >= CASE WHEN owner IS NULL THEN ? ELSE ? END",
+            (slug, number, now - negative_ttl, now - ttl)
+        )
+        return row[0] if row else None
+    except Exception as e:
+        logging.error(f"Ошибка при чтении кэша страницы {slug}-{number}: {e}")
+        return None
+
+async def get_gift_pages(slug: str, first: int, last: int, ttl: int, negative_ttl: int) -> dict[int, tuple]:
+    now = time.time()
+    try:
+        rows = await fetchall(
+            "SELECT number, owner, model, backdrop, symbol FROM gift_pages "
+            "WHERE slug = ? AND number BETWEEN ? AND ? AND fetched_at >= CASE WHEN owner IS NULL THEN ? ELSE ? END",
+            (slug, first, last, now - negative_ttl, now - ttl)
+        )
+        return {row[0]: row[1:] for row in rows}
+    except Exception as e:
+        logging.error(f"Ошибка при чтении кэша страниц {slug}-{first}..{last}: {e}")
+        return {}
+
+async def get_gift_page_numbers(slug: str, first: int, last: int) -> set[int]:
+    rows = await fetchall("SELECT number FROM gift_pages WHERE slug = ? AND number BETWEEN ? AND ?", (slug, first, last))
+    return {row[0] for row in rows}
+
+async def count_gift_pages(slug: str, first: int, last: int, fetched_after: float = 0.0) -> int:
+    row = await fetchone(
+        "SELECT COUNT(*) FROM gift_pages WHERE slug = ? AND number BETWEEN ? AND ? AND fetched_at >= ?",
+        (slug, first, last, fetched_after)
+    )
+    return row[0]
+
+async def get_stale_gift_pages(slug: str, last: int, fetched_before: float, limit: int) -> list[tuple[int, float]]:
+    return await fetchall(
+        "SELECT number, fetched_at FROM gift_pages WHERE slug = ? AND fetched_at < ? AND number <= ? "
+        "ORDER BY fetched_at LIMIT ?",
+        (slug, fetched_before, last, limit)
+    )
+
+async def query_gift_pages(slug: str, first: int, last: int, column: str | None = None,
+                           values: list[str] = ()) -> list[tuple]:
+    sql = ("SELECT number, owner, model, backdrop, symbol FROM gift_pages "
+           "WHERE slug = ? AND number BETWEEN ? AND ? AND owner IS NOT NULL")
+    params = [slug, first, last]
+    if column in ("model", "backdrop") and values:
+        sql += f" AND {column} COLLATE NOCASE IN ({', '.join('?' * len(values))})"
+        params.extend(values)
+    return await fetchall(sql + " ORDER BY number", tuple(params))
+
+async def get_gift_index_stats(fetched_after: float) -> tuple[int, int]:
+    try:
+        return await fetchone("SELECT COUNT(*), COUNT(CASE WHEN fetched_at >= ? THEN 1 END) FROM gift_pages", (fetched_after,))
+    except Exception as e:
+        logging.error(f"Ошибка при подсчете индекса: {e}")
+        return 0, 0
+
+def is_transient_status(status: int) -> bool:
+    # 429 и 5xx говорят о состоянии t.me или прокси, а не о самой странице, поэтому не кэшируются даже как негативные.
+    return status == 429 or status >= 500
+
+async def save_gift_page(slug: str, number: int, status: int, record=None):
+    if is_transient_status(status):
+        return
+    owner, model, backdrop, symbol = (record.owner, record.model, record.backdrop, record.symbol) if record else (None,) * 4
+    _gift_pages_buffer.append((slug, number, status, owner, model, backdrop, symbol, time.time()))
+    if len(_gift_pages_buffer) >= GIFT_PAGES_BATCH_SIZE:
+        await flush_gift_pages()
+
+async def flush_gift_pages():
+    if not _gift_pages_buffer:
+        return
+    rows = _gift_pages_buffer[:]
+    _gift_pages_buffer.clear()
+    try:
+        await executemany(
+            "INSERT OR REPLACE INTO gift_pages (slug, number, status, owner, model, backdrop, symbol, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+    except BaseException as e:
+        # Строки возвращаются в начало буфера (пришедшие за время записи новее и должны перезаписать их)
+        # и уйдут со следующей записью, в том числе если запись отменили.
+        _gift_pages_buffer[:0] = rows
+        overflow = len(_gift_pages_buffer) - GIFT_PAGES_BUFFER_LIMIT
+        if overflow > 0:
+            del _gift_pages_buffer[:overflow]
+            logging.error(f"Буфер кэша страниц переполнен, отброшено {overflow} самых старых строк.")
+        if not isinstance(e, Exception):
+            raise
+        logging.error(f"Ошибка при сохранении кэша страниц ({len(rows)} шт.): {e}")
+
+async def create_search_job(user_id: int, chat_id: int, gift_name: str, start_id: int, end_id: int,
+                            filters: str, max_matches: int | None = None) -> int | None:
+    now = time.time()
+    try:
+        async with transaction() as db:
+            cursor = await db.execute(
+                "INSERT INTO search_jobs (user_id, chat_id, gift_name, start_id, end_id, filters, max_matches, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_id, chat_id, gift_name, start_id, end_id, filters, max_matches, now, now)
+            )
+            return cursor.lastrowid
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении поиска пользователя {user_id}: {e}")
+        return None
+
+async def save_search_checkpoints(jobs: list[tuple[bytes, int, int]], matches: list[tuple[int, str, str]],
+                                  finished_ids: list[int] = ()) -> bool:
+    now = time.time()
+    try:
+        async with transaction() as db:
+            await db.executemany(
+                "UPDATE search_jobs SET processed = ?, processed_count = ?, updated_at = ? WHERE id = ?",
+                [(processed, processed_count, now, job_id) for processed, processed_count, job_id in jobs]
+            )
+            if matches:
+                await db.executemany("INSERT OR IGNORE INTO search_matches (job_id, url, owner) VALUES (?, ?, ?)", matches)
+            if finished_ids:
+                await db.executemany("UPDATE search_jobs SET status = 'done' WHERE id = ?", [(i,) for i in finished_ids])
+        return True
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении прогресса поисков: {e}")
+        return False
+
+async def get_active_search_jobs() -> list[tuple]:
+    try:
+        return await fetchall(
+            "SELECT id, user_id, chat_id, gift_name, start_id, end_id, filters, max_matches, processed "
+            "FROM search_jobs WHERE status = 'active' ORDER BY id"
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при получении незавершенных поисков: {e}")
+        return []
+
+async def get_latest_search_result(chat_id: int, updated_after: float) -> tuple | None:
+    try:
+        return await fetchone(
+            "SELECT id, gift_name, start_id, end_id FROM search_jobs "
+            "WHERE chat_id = ? AND status = 'done' AND updated_at >= ? ORDER BY id DESC LIMIT 1",
+            (chat_id, updated_after)
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при получении последнего поиска чата {chat_id}: {e}")
+        return None
+
+async def get_search_matches(job_id: int) -> list[tuple[str, str]]:
+    try:
+        return await fetchall("SELECT url, owner FROM search_matches WHERE job_id = ? ORDER BY rowid", (job_id,))
+    except Exception as e:
+        logging.error(f"Ошибка при получении результатов поиска #{job_id}: {e}")
+        return []
+
+async def get_gift_supply(slug: str) -> tuple[int, float] | None:
+    try:
+        return await fetchone("SELECT supply, checked_at FROM gift_supply WHERE slug = ?", (slug,))
+    except Exception as e:
+        logging.error(f"Ошибка при чтении тиража {slug}: {e}")
+        return None
+
+async def save_gift_supply(slug: str, supply: int):
+    try:
+        await execute(
+            "INSERT OR REPLACE INTO gift_supply (slug, supply, checked_at) VALUES (?, ?, ?)", (slug, supply, time.time())
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении тиража {slug}: {e}")
+
+async def create_scan_shard(slug: str, numbers: str) -> int:
+    async with transaction() as db:
+        cursor = await db.execute(
+            "INSERT INTO scan_shards (slug, numbers, created_at) VALUES (?, ?, ?)", (slug, numbers, time.time())
+        )
+        return cursor.lastrowid
+
+async def lease_scan_shard(worker: str, lease_seconds: float) -> tuple | None:
+    now = time.time()
+    async with transaction() as db:
+        async with db.execute(
+            "SELECT id, slug, numbers FROM scan_shards WHERE status = 'pending' OR leased_until < ? ORDER BY id LIMIT 1",
+            (now,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is not None:
+            await db.execute(
+                "UPDATE scan_shards SET status = 'leased', worker = ?, leased_until = ? WHERE id = ?",
+                (worker, now + lease_seconds, row[0])
+            )
+        return row
+
+async def delete_scan_shard(shard_id: int) -> bool:
+    return await execute("DELETE FROM scan_shards WHERE id = ?", (shard_id,)) > 0
+
+async def clear_scan_shards():
+    await execute("DELETE FROM scan_shards")
+
+async def count_scan_shards() -> dict[str, int]:
+    try:
+        return dict(await fetchall("SELECT status, COUNT(*) FROM scan_shards GROUP BY status"))
+    except Exception as e:
+        logging.error(f"Ошибка при подсчете шардов: {e}")
+        return {}
@@ -1,29 +1,41 @@
 import asyncio
-import aiohttp
-from aiogram import Router, types
+import html
+import time
+from aiogram import Bot, Router, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
 from aiogram.filters import Command
 
 from filters.admin import IsAdminFilter
+import config
 import database as db
-from services.proxy_manager import proxy_manager
+from services import metrics
+from services.access_cache import access_cache
+from services.gift_fetcher import fetch_limiter, gift_fetches, shard_fetches
+from services.gift_index import gift_indexer
+from services.http_client import is_valid_proxy
+from services.profiler import profiler
+from services.proxy_manager import display_proxy, proxy_manager
+from services.search_jobs import search_scheduler
+from services.shard_queue import shard_queue
+from services.worker_broker import worker_broker
+from services.proxy_prober import proxy_prober
+
+CHECK_PROGRESS_INTERVAL = 3.0
+MESSAGE_LIMIT = 4096
 
 router = Router()
 router.message.filter(IsAdminFilter())
 
 
-async def check_proxy(session: aiohttp.ClientSession, proxy_str: str) -> bool:
-    proxy_url = None
-    try:
-        if "://" in proxy_str:
-            proxy_url = proxy_str
-        else:
-            ip, port, login, password = proxy_str.split(":")
-            proxy_url = f"socks5://{login}:{password}@{ip}:{port}"
-
-        async with session.get("https://api.ipify.org?format=json", proxy=proxy_url, timeout=10) as response:
-            return response.status == 200 and await response.json()
-    except Exception:
-        return False
+def format_proxy_stats(proxy_str: str, latency_ms: float | None, success_count: int, failure_count: int,
+                       last_checked: float | None, markup: bool = True) -> str:
+    line = f"<code>{html.escape(proxy_str)}</code>" if markup else proxy_str
+    if last_checked is None:
+        return line + "\n    ⚪️ еще не проверялся"
+    minutes_ago = int((time.time() - last_checked) // 60)
+    latency = f"{latency_ms:.0f} мс" if latency_ms is not None else "—"
+    return line + f"\n    ⏱ {latency}, ✅ {success_count} / ❌ {failure_count}, проверен {minutes_ago} мин. назад"
 
 
 @router.message(Command("admin"))
@@ -40,16 +52,47 @@ async def cmd_admin_panel(message: types.Message):
         "<code>/delchannel</code> - отключить проверку подписки\n"
         "<code>/channelstatus</code> - текущий статус проверки\n\n"
         "<b>Управление прокси:</b>\n"
-        "<code>/addproxy proxy</code> - добавить прокси\n"
+        "<code>/addproxy proxy</code> - добавить прокси (можно несколько или файл .txt с подписью /addproxy)\n"
         "<code>/delproxy proxy</code> - удалить прокси\n"
-        "<code>/listproxies</code> - показать все прокси\n"
-        "<code>/checkproxies</code> - проверить прокси на работоспособность"
+        "<code>/listproxies</code> - показать все прокси со статистикой\n"
+        "<code>/checkproxies</code> - проверить прокси, <code>/checkproxies prune</code> - и удалить нерабочие\n\n"
+        "<b>Мониторинг:</b>\n"
+        "<code>/stats</code> - текущие лимиты, нагрузка и задержки парсера\n"
+        "<code>/profile 30</code> - снять профиль работающего бота за N секунд"
     )
     await message.answer(text)
 
 
+@router.message(Command("profile"))
+async def cmd_profile(message: types.Message):
+    try:
+        args = message.text.split()
+        seconds = float(args[1]) if len(args) > 1 else 30.0
+        if not 0 < seconds <= config.PROFILE_MAX_SECONDS: raise ValueError()
+    except ValueError:
+        await message.answer(f"❗️Неверный формат. Используй: /profile СЕКУНДЫ (до {config.PROFILE_MAX_SECONDS})")
+        return
+    if profiler.running:
+        await message.answer("⏳ Профиль уже снимается, дождись результата.")
+        return
+
+    await message.answer(f"⏱ Снимаю профиль {seconds:.0f} сек...")
+    result = await profiler.run(seconds)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    await message.answer_document(
+        BufferedInputFile(result.report().encode("utf-8"), filename=f"profile-{stamp}.txt"),
+        caption=result.summary()
+    )
+    # Свернутые стеки открываются в speedscope или flamegraph.pl.
+    await message.answer_document(
+        BufferedInputFile(result.collapsed().encode("utf-8"), filename=f"profile-{stamp}.collapsed")
+    )
+
+
 @router.message(Command("checkproxies"))
 async def cmd_check_proxies(message: types.Message):
+    args = message.text.split()
+    prune = len(args) > 1 and args[1] == "prune"
     proxies = await db.get_all_proxies()
     if not proxies:
         await message.answer("Список прокси пуст. Нечего проверять.")
@@ -58,28 +101,56 @@ async def cmd_check_proxies(message: types.Message):
     status_message = await message.answer(
         f"Начинаю проверку {len(proxies)} прокси... Это может занять некоторое время.")
 
-    working_proxies = []
-    failed_proxies = []
+    alive, dead = 0, 0
+    last_update = time.monotonic()
+
+    async def show_progress():
+        try:
+            await status_message.edit_text(
+                f"⏳ Проверено {alive + dead} из {len(proxies)}: 🟢 {alive} / 🔴 {dead}")
+        except TelegramBadRequest:
+            pass
 
-    async with aiohttp.ClientSession() as session:
-        tasks = [check_proxy(session, p) for p in proxies]
-        results = await asyncio.gather(*tasks)
+    progress_tasks = set()
 
-    for proxy, is_working in zip(proxies, results):
-        if is_working:
-            working_proxies.append(proxy)
+    def on_result(proxy_str: str, latency: float | None):
+        nonlocal alive, dead, last_update
+        if latency is not None:
+            alive += 1
         else:
-            failed_proxies.append(proxy)
+            dead += 1
+        # Прогресс обновляется не чаще раза в CHECK_PROGRESS_INTERVAL, иначе правки упрутся в лимиты Telegram.
+        if time.monotonic() - last_update >= CHECK_PROGRESS_INTERVAL:
+            last_update = time.monotonic()
+            task = asyncio.create_task(show_progress())
+            progress_tasks.add(task)
+            task.add_done_callback(progress_tasks.discard)
+
+    results = await proxy_prober.probe_all(proxies, on_result=on_result)
+    await asyncio.gather(*progress_tasks)
+
+    working = sorted((latency, proxy) for proxy, latency in results if latency is not None)
+    failed = sorted(proxy for proxy, latency in results if latency is None)
+    report = [f"OK    {latency * 1000:6.0f} ms  {proxy}" for latency, proxy in working]
+    report += [f"DEAD            {proxy}" for proxy in failed]
 
-    text = f"✅ <b>Проверка завершена!</b>\n\n"
-    text += f"🟢 <b>Работают ({len(working_proxies)}):</b>\n"
-    text += "\n".join([f"<code>{p.replace('<', '&lt;').replace('>', '&gt;')}</code>" for p in
-                       working_proxies]) or "Нет рабочих прокси."
-    text += f"\n\n🔴 <b>Не работают ({len(failed_proxies)}):</b>\n"
-    text += "\n".join([f"<code>{p.replace('<', '&lt;').replace('>', '&gt;')}</code>" for p in
-                       failed_proxies]) or "Все прокси в списке работают."
+    text = (
+        f"✅ <b>Проверка завершена!</b>\n\n"
+        f"🟢 Работают: {len(working)}\n"
+        f"🔴 Не работают: {len(failed)}"
+    )
+    if prune and failed:
+        removed = await db.delete_proxies(failed)
+        await proxy_manager.remove_proxies(failed)
+        text += f"\n\n🗑 Удалено нерабочих прокси: {removed}"
+    elif failed:
+        text += "\n\nЧтобы удалить нерабочие, запусти <code>/checkproxies prune</code>."
 
     await status_message.edit_text(text)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    await message.answer_document(
+        BufferedInputFile(("\n".join(report) + "\n").encode("utf-8"), filename=f"proxies-{stamp}.txt")
+    )
 
 
 @router.message(Command("block"))
@@ -87,6 +158,7 @@ async def cmd_block_user(message: types.Message):
     try:
         user_id = int(message.text.split()[1])
         await db.block_user(user_id)
+        access_cache.block(user_id)
         await message.answer(f"✅ Пользователь с ID <code>{user_id}</code> заблокирован.")
     except (IndexError, ValueError):
         await message.answer("❗️Неверный формат. Используй: /block ID")
@@ -97,6 +169,7 @@ async def cmd_unblock_user(message: types.Message):
     try:
         user_id = int(message.text.split()[1])
         await db.unblock_user(user_id)
+        access_cache.unblock(user_id)
         await message.answer(f"✅ Пользователь с ID <code>{user_id}</code> разблокирован.")
     except (IndexError, ValueError):
         await message.answer("❗️Неверный формат. Используй: /unblock ID")
@@ -133,37 +206,61 @@ async def cmd_set_channel(message: types.Message):
 
     channel = args[1]
     await db.set_subscription_channel(channel)
+    access_cache.set_channel(channel)
     await message.answer(f"✅ Проверка подписки установлена на канал: {channel}")
 
 
 @router.message(Command("delchannel"))
 async def cmd_del_channel(message: types.Message):
     await db.set_subscription_channel(None)
+    access_cache.set_channel(None)
     await message.answer("✅ Проверка подписки отключена.")
 
 
 @router.message(Command("channelstatus"))
 async def cmd_channel_status(message: types.Message):
-    channel = await db.get_subscription_channel()
+    channel = access_cache.channel
     if channel:
-        await message.answer(f"ℹ️ Проверка включена для канала: {channel}")
+        text = f"ℹ️ Проверка включена для канала: {channel}"
     else:
-        await message.answer("ℹ️ Проверка сейчас отключена.")
+        text = "ℹ️ Проверка сейчас отключена."
+    text += (
+        f"\n\nКэш подписок: {access_cache.hit_ratio:.0%} попаданий "
+        f"({access_cache.hits} из {access_cache.hits + access_cache.misses})"
+    )
+    await message.answer(text)
 
 
 @router.message(Command("addproxy"))
-async def cmd_add_proxy(message: types.Message):
-    args = message.text.split()
-    if len(args) != 2:
-        await message.answer("❗️Использование: /addproxy proxy_string")
+async def cmd_add_proxy(message: types.Message, bot: Bot):
+    # Прокси можно прислать списком в самой команде или файлом с подписью /addproxy, по одному в строке.
+    candidates = (message.text or message.caption or "").split()[1:]
+    if message.document is not None:
+        if message.document.file_size and message.document.file_size > config.PROXY_IMPORT_MAX_BYTES:
+            await message.answer(f"❗️Файл слишком большой, максимум {config.PROXY_IMPORT_MAX_BYTES // 1024} КБ.")
+            return
+        content = await bot.download(message.document)
+        for line in content.read().decode("utf-8", errors="ignore").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                candidates.append(line)
+    if not candidates:
+        await message.answer("❗️Использование: /addproxy proxy_string или файл .txt с подписью /addproxy")
         return
 
-    proxy_str = args[1]
-    if await db.add_proxy(proxy_str):
-        await proxy_manager.load_proxies()
-        await message.answer(f"✅ Прокси `{proxy_str}` успешно добавлен.")
-    else:
-        await message.answer(f"❌ Не удалось добавить прокси `{proxy_str}`. Возможно, он уже существует.")
+    valid, invalid = [], []
+    for proxy in dict.fromkeys(candidates):
+        (valid if is_valid_proxy(proxy) else invalid).append(proxy)
+    added = await db.add_proxies(valid)
+    proxy_manager.add_proxies(added)
+
+    text = f"✅ Добавлено прокси: {len(added)}"
+    if len(valid) > len(added):
+        text += f"\n♻️ Уже были в списке: {len(valid) - len(added)}"
+    if invalid:
+        examples = "\n".join(f"<code>{html.escape(proxy)}</code>" for proxy in invalid[:5])
+        text += f"\n❌ Неверный формат: {len(invalid)}\n{examples}"
+    await message.answer(text)
 
 
 @router.message(Command("delproxy"))
@@ -175,19 +272,99 @@ async def cmd_del_proxy(message: types.Message):
 
     proxy_str = args[1]
     if await db.delete_proxy(proxy_str):
-        await proxy_manager.load_proxies()
-        await message.answer(f"✅ Прокси `{proxy_str}` удален.")
+        await proxy_manager.remove_proxies([proxy_str])
+        await message.answer(f"✅ Прокси <code>{html.escape(proxy_str)}</code> удален.")
     else:
-        await message.answer(f"❌ Прокси `{proxy_str}` не найден в базе.")
+        await message.answer(f"❌ Прокси <code>{html.escape(proxy_str)}</code> не найден в базе.")
 
 
 @router.message(Command("listproxies"))
 async def cmd_list_proxies(message: types.Message):
-    proxies = await db.get_all_proxies()
-    if not proxies:
+    stats = await db.get_proxy_stats()
+    if not stats:
         await message.answer("Список прокси пуст.")
         return
 
     text = "<b>Список добавленных прокси:</b>\n\n"
-    text += "\n".join([f"<code>{p.replace('<', '&lt;').replace('>', '&gt;')}</code>" for p in proxies])
-    await message.answer(text)
\ No newline at end of file
+    text += "\n".join([format_proxy_stats(*row) for row in stats])
+    if len(text) <= MESSAGE_LIMIT:
+        await message.answer(text)
+        return
+
+    # Длинный список не влезает в одно сообщение Telegram, поэтому уходит файлом.
+    report = "\n".join(format_proxy_stats(*row, markup=False) for row in stats) + "\n"
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    await message.answer_document(
+        BufferedInputFile(report.encode("utf-8"), filename=f"proxies-{stamp}.txt"),
+        caption=f"Список добавленных прокси: {len(stats)} шт."
+    )
+
+
+def format_histogram(title: str, histogram: metrics.Histogram) -> str:
+    merged = histogram.merged()
+    if not merged.count:
+        return f"{title}: нет данных"
+    p50 = histogram.quantile(0.5, merged) * 1000
+    p95 = histogram.quantile(0.95, merged) * 1000
+    return f"{title}: {p50:.2f} / {p95:.2f} мс ({merged.count} шт.)"
+
+
+def format_proxy_requests(proxy: str) -> str:
+    if not metrics.enabled:
+        return ""
+    success = metrics.proxy_requests_total.get(proxy, "success")
+    failure = metrics.proxy_requests_total.get(proxy, "failure")
+    return f", ✅ {success:.0f} / ❌ {failure:.0f}"
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: types.Message):
+    if worker_broker.enabled:
+        fetch, proxy_limiters = worker_broker.limiter_totals()
+    else:
+        fetch, proxy_limiters = fetch_limiter, proxy_manager.limiters
+    text = (
+        "<b>Парсер</b>\n\n"
+        f"Общий лимит запросов: {fetch.limit} (в работе {fetch.in_flight}, "
+        f"↑ {fetch.increases} / ↓ {fetch.decreases})\n"
+        f"Склеено одинаковых запросов: {gift_fetches.deduplicated} из "
+        f"{gift_fetches.executed + gift_fetches.deduplicated}\n"
+    )
+    indexed, fresh = await db.get_gift_index_stats(time.time() - config.GIFT_INDEX_MAX_AGE)
+    text += f"Индекс: {indexed} страниц, из них свежих {fresh}; индексатор обновил {gift_indexer.indexed}\n"
+    if worker_broker.enabled:
+        shards = await db.count_scan_shards()
+        workers = shard_queue.active_workers(within=60)
+        text += (
+            f"Воркеров на связи: {len(workers)}, шардов в очереди {shards.get('pending', 0)}, "
+            f"в работе {shards.get('leased', 0)}, готово {shard_queue.completed}\n"
+            f"Номеров, взятых из чужих шардов: {shard_fetches.deduplicated} из "
+            f"{shard_fetches.executed + shard_fetches.deduplicated}\n"
+        )
+    text += (
+        f"Поисков выполняется: {len(search_scheduler.running)}, в очереди {len(search_scheduler.queue)}\n"
+    )
+    if metrics.enabled:
+        text += (
+            f"Проверено номеров: совпало {metrics.pages_total.get('match'):.0f}, "
+            f"мимо {metrics.pages_total.get('miss'):.0f}, ошибок {metrics.pages_total.get('error'):.0f}\n"
+            "\n<b>Задержки (p50 / p95):</b>\n"
+            f"{format_histogram('Загрузка страницы', metrics.fetch_seconds)}\n"
+            f"{format_histogram('Разбор HTML', metrics.parse_seconds)}\n"
+            f"{format_histogram('Фильтры', metrics.filter_seconds)}\n"
+            f"{format_histogram('Bot API', metrics.telegram_api_seconds)}\n"
+            f"{format_histogram('Ожидание отправки', metrics.telegram_wait_seconds)}\n"
+            f"{format_histogram('Middleware доступа', metrics.middleware_seconds)}\n"
+        )
+    limiters = sorted(proxy_limiters.items(), key=lambda item: item[1].limit, reverse=True)
+    if limiters:
+        # Счетчики запросов ведет процесс, который их делает, поэтому с воркерами бот их не показывает.
+        text += "\n<b>Лимиты прокси (сумма по боту и воркерам):</b>\n" if worker_broker.enabled else "\n<b>Лимиты прокси:</b>\n"
+        text += "\n".join(
+            f"<code>{display_proxy(proxy)}</code> — {limiter.limit} (в работе {limiter.in_flight})"
+            + ("" if worker_broker.enabled else format_proxy_requests(display_proxy(proxy)))
+            for proxy, limiter in limiters[:20]
+        )
+        if len(limiters) > 20:
+            text += f"\n... и еще {len(limiters) - 20}"
+    await message.answer(text)
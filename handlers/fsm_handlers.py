@@ -1,38 +1,30 @@
-import asyncio
 import html
+import json
 import logging
-from typing import List, Tuple
 
-import aiohttp
-from aiogram import F, Router, types
+from aiogram import Bot, F, Router, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from bs4 import BeautifulSoup
 
+import config
 import database as db
-from services.proxy_manager import proxy_manager
+from services.gift_catalog import GIFT_NUMBERS, GIFT_PAGES, find_gift, gift_slug
+from services.gift_filter import GiftFilter
+from services.gift_index import search_index
+from services.gift_supply import gift_supply
+from services.result_store import SearchResult, format_record, result_store
+from services.search_jobs import SearchJob, SearchRejected, search_scheduler
 from keyboards.inline import create_pagination_keyboard
-from handlers.user_handlers import user_search_results
-
-GIFTS = {
-    1: "Signet Ring", 2: "Skull Flower", 3: "Snow Mittens", 4: "Spiced Wine", 5: "Spy Agaric",
-    6: "Star Notepad", 7: "Swiss Watch", 8: "Trapped Heart", 9: "Vintage Cigar", 10: "Voodoo Doll",
-    11: "Witch Hat", 12: "Lunar Snake", 13: "Mad Pumpkin", 14: "Magic Potion", 15: "Mini Oscar",
-    16: "Party Sparkler", 17: "Perfume Bottle", 18: "Plush Pepe", 19: "Precious Peach", 20: "Santa Hat",
-    21: "Scared Cat", 22: "Sharp Tongue", 23: "Hex Pot", 24: "Homemade Cake", 25: "Hypno Lollipop",
-    26: "Ion Gem", 27: "Jelly Bunny", 28: "Jester Hat", 29: "Jingle Bells", 30: "Kissed Frog",
-    31: "Lol Pop", 32: "Love Candle", 33: "Cookie Heart", 34: "Crystal Ball", 35: "MOOO",
-    36: "Desk Calendar", 37: "Durovs Cap", 38: "Eternal Candle", 39: "Eternal Rose", 40: "Evil Eye",
-    41: "Flying Broom", 42: "Genie Lamp", 43: "Ginger Cookie", 44: "Sleigh Bell", 45: "Sakura Flower",
-    46: "Top Hat", 47: "Diamond Ring", 48: "Love Potion", 49: "Toy Bear", 50: "Loot Bag",
-    51: "Astral Shard", 52: "HAPPY", 53: "BdAy", 54: "BDay Candle", 55: "Berry Box",
-    56: "Bunny Muffin", 57: "Tama GadGet", 58: "Candy Cane", 59: "Snow Globe", 60: "Electric Skull",
-    61: "Winter Wreath", 62: "Neko Helmet", 63: "Record Player", 64: "Jack In The Box", 65: "Easter Egg",
-    66: "Holiday Drink", 67: "Xmas Stocking", 68: "Snake Box", 69: "Pet Snake", 70: "Big Year",
-    71: "Heart Locket", 72: "Bow Tie", 73: "Heroic Helmet", 74: "Nail Bracelet", 75: "Restless Jar",
-    76: "Light Sword", 77: "Gem Signet", 78: "Bonded Ring"
-}
+
+GIFT_PROMPT = "<b>Шаг 1/6: Выбор подарка</b>\n\nВыберите подарок из списка или введите его номер/название."
+MAX_MATCHES_PROMPT = (
+    "<b>Шаг 6/6: Лимит</b>\n\nСколько совпадений достаточно? Поиск остановится, как только найдет столько, "
+    "или введи /skip, чтобы проверить весь диапазон."
+)
+# Не больше стольких совпадений в одном сообщении за тик, остальные попадут только в итоговый список.
+MATCHES_PER_UPDATE = 10
 
 router = Router()
 
@@ -43,81 +35,56 @@ class SearchStates(StatesGroup):
     waiting_for_models = State()
     waiting_for_backgrounds = State()
     waiting_for_patterns = State()
-
-
-async def parse_gift_data(session: aiohttp.ClientSession, url: str) -> Tuple[str, str, str] | None:
-    proxy = await proxy_manager.get_proxy()
-    proxy_url = None
-    if proxy:
-        try:
-            if "://" in proxy:
-                proxy_url = proxy
-            else:
-                ip, port, login, password = proxy.split(":")
-                proxy_url = f"socks5://{login}:{password}@{ip}:{port}"
-        except Exception:
-            logging.error(f"Неверный формат прокси: {proxy}")
-            proxy = None
-
-    try:
-        async with session.get(url, proxy=proxy_url, timeout=15, allow_redirects=False) as response:
-            if response.status == 200:
-                html_text = await response.text()
-                soup = BeautifulSoup(html_text, "lxml")
-                owner_tag = soup.select_one('table.tgme_gift_table th:-soup-contains("Owner") + td a')
-                if owner_tag and owner_tag.get('href'):
-                    owner_username = "@" + owner_tag['href'].replace('https://t.me/', '')
-                    return (url, owner_username, html_text)
-            return None
-    except Exception as e:
-        if proxy:
-            proxy_manager.report_failure(proxy)
-        logging.debug(f"Ошибка при парсинге {url}: {e}")
-        return None
+    waiting_for_max_matches = State()
 
 
 @router.message(Command("search"))
 async def cmd_search(message: types.Message, state: FSMContext):
     await state.clear()
-    page_size = 10
-    gift_items = list(GIFTS.items())
-    pages = ["\n".join([f"<code>{num}</code> - {name}" for num, name in gift_items[i:i + page_size]]) for i in
-             range(0, len(gift_items), page_size)]
-    await state.update_data(gift_pages=pages)
-    text = "<b>Шаг 1/5: Выбор подарка</b>\n\nВыберите подарок из списка или введите его номер/название."
-    keyboard = create_pagination_keyboard(current_page=0, total_pages=len(pages), prefix="gift_page")
-    await message.answer(f"{text}\n\n{pages[0]}", reply_markup=keyboard)
+    # Страницы каталога общие для всех, в состоянии пользователя хранится только номер текущей.
+    await state.update_data(gift_page=0)
+    keyboard = create_pagination_keyboard(current_page=0, total_pages=len(GIFT_PAGES), prefix="gift_page")
+    await message.answer(f"{GIFT_PROMPT}\n\n{GIFT_PAGES[0]}", reply_markup=keyboard)
     await state.set_state(SearchStates.waiting_for_gift)
 
 
+@router.message(Command("cancel"))
+async def cmd_cancel(message: types.Message, state: FSMContext):
+    if await state.get_state() is not None:
+        await state.clear()
+        await message.answer("❌ Настройка поиска отменена.")
+        return
+    if search_scheduler.cancel_user(message.from_user.id):
+        await message.answer("🛑 Поиск остановлен. Сейчас пришлю то, что успел найти.")
+    else:
+        await message.answer("ℹ️ У вас нет активного поиска.")
+
+
 @router.callback_query(F.data.startswith("gift_page_"), SearchStates.waiting_for_gift)
 async def gift_pagination_handler(query: types.CallbackQuery, state: FSMContext):
     page = int(query.data.split("_")[2])
-    user_data = await state.get_data()
-    pages = user_data.get("gift_pages", [])
-    if 0 <= page < len(pages):
-        keyboard = create_pagination_keyboard(current_page=page, total_pages=len(pages), prefix="gift_page")
-        text = "<b>Шаг 1/5: Выбор подарка</b>\n\nВыберите подарок из списка или введите его номер/название."
-        await query.message.edit_text(f"{text}\n\n{pages[page]}", reply_markup=keyboard)
+    if 0 <= page < len(GIFT_PAGES):
+        await state.update_data(gift_page=page)
+        keyboard = create_pagination_keyboard(current_page=page, total_pages=len(GIFT_PAGES), prefix="gift_page")
+        await query.message.edit_text(f"{GIFT_PROMPT}\n\n{GIFT_PAGES[page]}", reply_markup=keyboard)
     await query.answer()
 
 
 @router.message(SearchStates.waiting_for_gift)
 async def process_gift_selection(message: types.Message, state: FSMContext):
-    selection = message.text.strip()
-    gift_name = ""
-    if selection.isdigit() and int(selection) in GIFTS:
-        gift_name = GIFTS[int(selection)]
-    else:
-        gift_name = next((name for name in GIFTS.values() if selection.lower() == name.lower()), "")
+    gift_name, suggestions = find_gift(message.text or "")
 
     if not gift_name:
-        await message.answer("❌ Подарок не найден. Введите его номер или точное название.")
+        if suggestions:
+            options = "\n".join(f"<code>{GIFT_NUMBERS[name]}</code> - {name}" for name in suggestions)
+            await message.answer(f"❓ Подарок не найден. Возможно, вы имели в виду:\n\n{options}\n\nВведите номер или название.")
+        else:
+            await message.answer("❌ Подарок не найден. Введите его номер или название.")
         return
 
     await state.update_data(gift_name=gift_name)
     await message.answer(
-        f"✅ Ищем <b>{gift_name}</b>.\n\n<b>Шаг 2/5: Диапазон поиска</b>\n\nВведи диапазон в формате <code>1-10000</code>. Максимум 20,000.")
+        f"✅ Ищем <b>{gift_name}</b>.\n\n<b>Шаг 2/6: Диапазон поиска</b>\n\nВведи диапазон в формате <code>1-10000</code>. Максимум 20,000.")
     await state.set_state(SearchStates.waiting_for_range)
 
 
@@ -132,16 +99,46 @@ async def process_range(message: types.Message, state: FSMContext):
         await message.answer("❗️Неверный формат или диапазон. Введи как <code>1-10000</code>.")
         return
 
-    await state.update_data(start_id=start_id, end_id=end_id)
+    user_data = await state.get_data()
+    gift_name = user_data['gift_name']
+    # Свежий тираж берется из кэша сразу. Иначе он определяется в фоне, пока пользователь вводит фильтры,
+    # и диапазон сокращается уже перед запуском поиска: на вводе диапазона никто не ждет до 20 секунд.
+    supply = await gift_supply.cached(gift_slug(gift_name))
+    if supply is None:
+        gift_supply.prefetch(gift_slug(gift_name))
+    else:
+        end_id = await clip_to_supply(message, gift_name, start_id, end_id, supply)
+        if end_id is None:
+            return
+
+    await state.update_data(start_id=start_id, end_id=end_id, supply_checked=supply is not None)
+    if user_data.get('range_only'):
+        await state.update_data(range_only=False)
+        await start_search_with_filters(message, state)
+        return
     await message.answer(
-        "<b>Шаг 3/5: Модели</b>\n\nВведи модели через запятую (например, <code>Common, Rare</code>) или /skip, чтобы пропустить.")
+        "<b>Шаг 3/6: Модели</b>\n\nВведи модели через запятую (например, <code>Ninja Mike, Frog*</code>) или /skip, чтобы пропустить.\n"
+        "Название сравнивается целиком, а <code>*</code> в конце ищет по началу названия.")
     await state.set_state(SearchStates.waiting_for_models)
 
 
+async def clip_to_supply(message: types.Message, gift_name: str, start_id: int, end_id: int,
+                         supply: int | None) -> int | None:
+    if supply is not None and start_id > supply:
+        await message.answer(
+            f"❗️У <b>{gift_name}</b> всего {supply} номеров. Введи диапазон в пределах <code>1-{supply}</code>.")
+        return None
+    if supply is not None and end_id > supply:
+        end_id = supply
+        await message.answer(
+            f"✂️ У <b>{gift_name}</b> всего {supply} номеров, диапазон сокращен до <code>{start_id}-{end_id}</code>.")
+    return end_id
+
+
 @router.message(SearchStates.waiting_for_models, Command("skip"))
 async def process_skip_models(message: types.Message, state: FSMContext):
     await state.update_data(models=[])
-    await message.answer("<b>Шаг 4/5: Цвета фона</b>\n\nВведи цвета через запятую (<code>Red, Blue</code>) или /skip.")
+    await message.answer("<b>Шаг 4/6: Цвета фона</b>\n\nВведи цвета через запятую (<code>Red, Blue</code>) или /skip.")
     await state.set_state(SearchStates.waiting_for_backgrounds)
 
 
@@ -149,14 +146,14 @@ async def process_skip_models(message: types.Message, state: FSMContext):
 async def process_models(message: types.Message, state: FSMContext):
     models = [m.strip() for m in message.text.split(',') if m.strip()]
     await state.update_data(models=models)
-    await message.answer("<b>Шаг 4/5: Цвета фона</b>\n\nВведи цвета через запятую (<code>Red, Blue</code>) или /skip.")
+    await message.answer("<b>Шаг 4/6: Цвета фона</b>\n\nВведи цвета через запятую (<code>Red, Blue</code>) или /skip.")
     await state.set_state(SearchStates.waiting_for_backgrounds)
 
 
 @router.message(SearchStates.waiting_for_backgrounds, Command("skip"))
 async def process_skip_backgrounds(message: types.Message, state: FSMContext):
     await state.update_data(backgrounds=[])
-    await message.answer("<b>Шаг 5/5: Узоры</b>\n\nВведи узоры через запятую (<code>Stripes</code>) или /skip.")
+    await message.answer("<b>Шаг 5/6: Узоры</b>\n\nВведи узоры через запятую (<code>Stripes</code>) или /skip.")
     await state.set_state(SearchStates.waiting_for_patterns)
 
 
@@ -164,20 +161,38 @@ async def process_skip_backgrounds(message: types.Message, state: FSMContext):
 async def process_backgrounds(message: types.Message, state: FSMContext):
     backgrounds = [b.strip() for b in message.text.split(',') if b.strip()]
     await state.update_data(backgrounds=backgrounds)
-    await message.answer("<b>Шаг 5/5: Узоры</b>\n\nВведи узоры через запятую (<code>Stripes</code>) или /skip.")
+    await message.answer("<b>Шаг 5/6: Узоры</b>\n\nВведи узоры через запятую (<code>Stripes</code>) или /skip.")
     await state.set_state(SearchStates.waiting_for_patterns)
 
 
 @router.message(SearchStates.waiting_for_patterns, Command("skip"))
-async def process_skip_patterns_and_start(message: types.Message, state: FSMContext):
+async def process_skip_patterns(message: types.Message, state: FSMContext):
     await state.update_data(patterns=[])
-    await start_search_with_filters(message, state)
+    await message.answer(MAX_MATCHES_PROMPT)
+    await state.set_state(SearchStates.waiting_for_max_matches)
 
 
 @router.message(SearchStates.waiting_for_patterns)
-async def process_patterns_and_start(message: types.Message, state: FSMContext):
+async def process_patterns(message: types.Message, state: FSMContext):
     patterns = [p.strip() for p in message.text.split(',') if p.strip()]
     await state.update_data(patterns=patterns)
+    await message.answer(MAX_MATCHES_PROMPT)
+    await state.set_state(SearchStates.waiting_for_max_matches)
+
+
+@router.message(SearchStates.waiting_for_max_matches, Command("skip"))
+async def process_skip_max_matches_and_start(message: types.Message, state: FSMContext):
+    await state.update_data(max_matches=None)
+    await start_search_with_filters(message, state)
+
+
+@router.message(SearchStates.waiting_for_max_matches)
+async def process_max_matches_and_start(message: types.Message, state: FSMContext):
+    selection = message.text.strip()
+    if not selection.isdecimal() or int(selection) == 0:
+        await message.answer("❗️Введи целое число больше нуля или /skip.")
+        return
+    await state.update_data(max_matches=int(selection))
     await start_search_with_filters(message, state)
 
 
@@ -186,80 +201,163 @@ async def start_search_with_filters(message: types.Message, state: FSMContext):
     gift_name = user_data['gift_name']
     start_id = user_data['start_id']
     end_id = user_data['end_id']
+    if not user_data.get('supply_checked'):
+        slug = gift_slug(gift_name)
+        supply = await gift_supply.cached(slug)
+        if supply is None:
+            await message.answer(f"⏳ Определяю тираж <b>{gift_name}</b>...")
+            supply = await gift_supply.get(slug)
+        end_id = await clip_to_supply(message, gift_name, start_id, end_id, supply)
+        if end_id is None:
+            # Фильтры уже введены, поэтому переспрашивается только диапазон, и поиск стартует сразу после него.
+            await state.update_data(range_only=True)
+            await state.set_state(SearchStates.waiting_for_range)
+            return
     models = user_data['models']
     backgrounds = user_data['backgrounds']
     patterns = user_data['patterns']
+    max_matches = user_data.get('max_matches')
     await state.clear()
 
-    blacklist = await db.get_blacklist()
-    status_message = await message.answer(
-        f"🚀 Начинаю поиск <b>{gift_name}</b> в диапазоне <code>{start_id}-{end_id}</code>...")
-
-    found_results: List[Tuple[str, str]] = []
-    total_count = end_id - start_id + 1
-    processed_count = 0
-
-    tasks = []
-    gift_slug = gift_name.replace(" ", "")
-
-    async with aiohttp.ClientSession() as session:
-        for num in range(start_id, end_id + 1):
-            url = f"https://t.me/nft/{gift_slug}-{num}"
-            tasks.append(asyncio.create_task(parse_gift_data(session, url)))
-
-        for i, task in enumerate(asyncio.as_completed(tasks)):
-            result = await task
-            processed_count += 1
-            if result:
-                url, owner, html_text = result
-                html_lower = html_text.lower()
-
-                if owner.lower() in blacklist:
-                    continue
-                if models and not any(m.lower() in html_lower for m in models):
-                    continue
-                if backgrounds and not any(b.lower() in html_lower for b in backgrounds):
-                    continue
-                if patterns and not any(p.lower() in html_lower for p in patterns):
-                    continue
-
-                found_results.append((url, owner))
-
-            if i % 50 == 0 or processed_count == total_count:
-                try:
-                    await status_message.edit_text(
-                        f"⏳ Идет поиск <b>{gift_name}</b>...\n\n"
-                        f"Проверено: {processed_count}/{total_count}\n"
-                        f"Найдено (с учетом фильтров): {len(found_results)}"
-                    )
-                except Exception:
-                    pass
-
-    await status_message.delete()
-
-    if not found_results:
-        await message.answer(f"😔 Поиск завершен. С учетом фильтров ничего не найдено.")
+    filters = {"models": models, "backgrounds": backgrounds, "patterns": patterns}
+    gift_filter = GiftFilter(**filters, blacklist=await db.get_blacklist())
+
+    # Если все страницы диапазона уже свежие в индексе, ответ собирается из БД без единого запроса к t.me.
+    found = await search_index(gift_slug(gift_name), start_id, end_id, gift_filter, config.GIFT_INDEX_MAX_AGE)
+    if found is not None:
+        if max_matches:
+            found = found[:max_matches]
+        job_id = await db.create_search_job(
+            message.from_user.id, message.chat.id, gift_name, start_id, end_id, json.dumps(filters), max_matches)
+        await db.save_search_checkpoints(
+            [(None, end_id - start_id + 1, job_id)], [(job_id, url, owner) for url, owner in found], [job_id])
+        await send_search_results(message.bot, message.chat.id, gift_name, start_id, end_id, found)
         return
 
-    unique_results = list(dict.fromkeys(found_results))
+    try:
+        search_scheduler.ensure_can_submit(message.from_user.id)
+    except SearchRejected as e:
+        await message.answer(f"❗️{e}")
+        return
 
-    page_size = 5
-    result_pages = []
-    header_template = (
-        f"✅ <b>Поиск завершен!</b>\n"
-        f"🎁 Подарок: <b>{gift_name}</b>\n"
-        f"🔢 Диапазон: {start_id}-{end_id}\n"
-        f"👥 Найдено с учетом фильтров: {len(unique_results)}\n\n"
+    job_id = await db.create_search_job(
+        message.from_user.id, message.chat.id, gift_name, start_id, end_id, json.dumps(filters), max_matches)
+    job = SearchJob(
+        user_id=message.from_user.id,
+        chat_id=message.chat.id,
+        gift_name=gift_name,
+        start_id=start_id,
+        end_id=end_id,
+        gift_filter=gift_filter,
+        filters=filters,
+        job_id=job_id,
+        max_matches=max_matches
     )
+    status_message = await message.answer(
+        f"🚀 Начинаю поиск <b>{gift_name}</b> в диапазоне <code>{start_id}-{end_id}</code>...\n"
+        f"Найденное буду присылать по ходу поиска. Остановить: /cancel")
+    job.status_message_id = status_message.message_id
+    attach_search_reporting(job, message.bot)
+    search_scheduler.submit(job, force=True)
 
-    for i in range(0, len(unique_results), page_size):
-        chunk = unique_results[i:i + page_size]
-        page_lines = [f"🔗 <a href='{url}'>NFT Gift</a>\n👤 {owner}" for url, owner in chunk]
-        page_content = "\n\n".join(page_lines)
-        page_text = header_template + "<b>Список:</b>\n" + page_content
-        result_pages.append(page_text)
 
-    user_search_results[message.chat.id] = result_pages
+async def resume_search_jobs(bot: Bot):
+    rows = await db.get_active_search_jobs()
+    if not rows:
+        return
+    blacklist = await db.get_blacklist()
+    for job_id, user_id, chat_id, gift_name, start_id, end_id, filters_json, max_matches, processed in rows:
+        filters = json.loads(filters_json)
+        job = SearchJob(
+            user_id=user_id,
+            chat_id=chat_id,
+            gift_name=gift_name,
+            start_id=start_id,
+            end_id=end_id,
+            gift_filter=GiftFilter(**filters, blacklist=blacklist),
+            filters=filters,
+            job_id=job_id,
+            processed=processed,
+            found=await db.get_search_matches(job_id),
+            max_matches=max_matches
+        )
+        try:
+            status_message = await bot.send_message(
+                chat_id,
+                f"♻️ Бот был перезапущен. Продолжаю поиск <b>{gift_name}</b> с места остановки "
+                f"({job.stats.processed}/{job.stats.total})..."
+            )
+            job.status_message_id = status_message.message_id
+        except Exception as e:
+            logging.warning(f"Не удалось уведомить чат {chat_id} о продолжении поиска #{job_id}: {e}")
+        attach_search_reporting(job, bot)
+        search_scheduler.submit(job, force=True)
+    logging.info(f"Продолжено незавершенных поисков: {len(rows)}.")
+
+
+def attach_search_reporting(job: SearchJob, bot: Bot):
+    job.on_progress = lambda job: report_search_progress(bot, job)
+    job.on_finish = lambda job: deliver_search_results(bot, job)
+
+
+async def send_new_matches(bot: Bot, job: SearchJob):
+    new_found = job.take_new_found()
+    if not new_found:
+        return
+    shown = new_found[:MATCHES_PER_UPDATE]
+    text = f"🔎 <b>{job.gift_name}</b>: новые совпадения\n\n" + "\n\n".join(format_record(*r) for r in shown)
+    if len(new_found) > len(shown):
+        text += f"\n\n…и еще {len(new_found) - len(shown)}, они будут в итоговом списке."
+    await bot.send_message(job.chat_id, text, disable_web_page_preview=True)
+
+
+async def report_search_progress(bot: Bot, job: SearchJob):
+    await send_new_matches(bot, job)
+    if job.status == "queued":
+        text = (
+            f"🕒 Поиск <b>{job.gift_name}</b> в очереди.\n\n"
+            f"Позиция в очереди: {search_scheduler.position(job)}"
+        )
+    else:
+        text = (
+            f"⏳ Идет поиск <b>{job.gift_name}</b>...\n\n"
+            f"Проверено: {job.stats.processed}/{job.stats.total}\n"
+            f"Найдено (с учетом фильтров): {len(job.found)}\n"
+            f"Скорость: {job.stats.rate:.1f} стр/сек"
+        )
+    try:
+        await bot.edit_message_text(text=text, chat_id=job.chat_id, message_id=job.status_message_id)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in e.message:
+            logging.warning(f"Не удалось обновить статус поиска #{job.id}: {e.message}")
+
+
+async def deliver_search_results(bot: Bot, job: SearchJob):
+    try:
+        await bot.delete_message(chat_id=job.chat_id, message_id=job.status_message_id)
+    except Exception:
+        pass
+
+    # Итоговый список ниже и так содержит все совпадения, поэтому не отправленные по ходу поиска просто отбрасываются.
+    job.take_new_found()
+    if job.stop_reason == "limit":
+        await bot.send_message(job.chat_id, f"🎯 Найдено {job.max_matches} совпадений, поиск остановлен.")
+    elif job.stop_reason == "cancelled":
+        await bot.send_message(
+            job.chat_id, f"🛑 Поиск остановлен. Проверено {job.stats.processed} из {job.stats.total}.")
+
+    records = job.found[:job.max_matches] if job.max_matches else job.found
+    await send_search_results(bot, job.chat_id, job.gift_name, job.start_id, job.end_id, records)
+
+
+async def send_search_results(bot: Bot, chat_id: int, gift_name: str, start_id: int, end_id: int,
+                              records: list[tuple[str, str]]):
+    if not records:
+        await bot.send_message(chat_id, f"😔 Поиск завершен. С учетом фильтров ничего не найдено.")
+        return
+
+    result = SearchResult(gift_name=gift_name, start_id=start_id, end_id=end_id, records=records)
+    result_store.put(chat_id, result)
 
-    keyboard = create_pagination_keyboard(current_page=0, total_pages=len(result_pages), prefix="result_page")
-    await message.answer(result_pages[0], reply_markup=keyboard, disable_web_page_preview=True)
\ No newline at end of file
+    keyboard = create_pagination_keyboard(current_page=0, total_pages=result.total_pages, prefix="result_page")
+    await bot.send_message(chat_id, result.render_page(0), reply_markup=keyboard, disable_web_page_preview=True)
@@ -1,12 +1,11 @@
 from aiogram import Router, types, F, Bot
 from aiogram.filters import CommandStart
-from aiogram.enums.chat_member_status import ChatMemberStatus
 
-import database as db
 from keyboards.inline import create_pagination_keyboard
+from services.access_cache import access_cache, fetch_membership
+from services.result_store import result_store
 
 router = Router()
-user_search_results = {}
 
 @router.message(CommandStart())
 async def cmd_start(message: types.Message):
@@ -15,6 +14,7 @@ async def cmd_start(message: types.Message):
         "Я бот для автоматического поиска NFT-подарков.\n\n"
         "<b>Доступные команды:</b>\n"
         "/search - Начать поиск подарков\n"
+        "/cancel - Остановить поиск\n"
         "/random - 30 рандомных юзеров (в разработке)\n\n"
         "❤️ Сделано с любовью от mvpcrazy\n"
         "🧑‍💻 Форум - https://lolz.live/members/3478629/"
@@ -22,19 +22,17 @@ async def cmd_start(message: types.Message):
     await message.answer(text, disable_web_page_preview=True)
 
 @router.callback_query(F.data == "check_subscription")
-async def check_subscription_callback(query: types.CallbackQuery, bot: Bot):
-    channel_username = await db.get_subscription_channel()
+async def check_subscription_callback(query: types.CallbackQuery, bot: Bot, is_member: bool | None = None):
+    channel_username = access_cache.channel
     if not channel_username:
         await query.answer("Проверка отключена администратором.", show_alert=True)
         return
 
     try:
-        member = await bot.get_chat_member(chat_id=channel_username, user_id=query.from_user.id)
-        if member.status in [
-            ChatMemberStatus.MEMBER,
-            ChatMemberStatus.ADMINISTRATOR,
-            ChatMemberStatus.CREATOR
-        ]:
+        if is_member is None:
+            is_member = await fetch_membership(bot, channel_username, query.from_user.id)
+            access_cache.set_membership(query.from_user.id, is_member)
+        if is_member:
             await query.answer("Спасибо за подписку!", show_alert=True)
             await query.message.delete()
         else:
@@ -44,17 +42,16 @@ async def check_subscription_callback(query: types.CallbackQuery, bot: Bot):
 
 @router.callback_query(F.data.startswith("result_page_"))
 async def result_pagination_handler(query: types.CallbackQuery):
-    chat_id = query.message.chat.id
-    if chat_id not in user_search_results:
+    result = await result_store.get(query.message.chat.id)
+    if result is None:
         await query.answer("Результаты поиска устарели.", show_alert=True)
         return
 
     page = int(query.data.split("_")[2])
-    pages = user_search_results[chat_id]
 
-    if 0 <= page < len(pages):
-        keyboard = create_pagination_keyboard(current_page=page, total_pages=len(pages), prefix="result_page")
-        await query.message.edit_text(pages[page], reply_markup=keyboard, disable_web_page_preview=True)
+    if 0 <= page < result.total_pages:
+        keyboard = create_pagination_keyboard(current_page=page, total_pages=result.total_pages, prefix="result_page")
+        await query.message.edit_text(result.render_page(page), reply_markup=keyboard, disable_web_page_preview=True)
 
     await query.answer()
 
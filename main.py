@@ -9,30 +9,64 @@ from aiogram.enums import ParseMode
 import config
 import database as db
 from middlewares.access import AccessMiddleware
+from services.access_cache import access_cache
+from services.gift_index import gift_indexer
+from services.gift_supply import gift_supply
+from services.http_client import http_client
+from services.metrics import metrics_server
 from services.proxy_manager import proxy_manager
+from services.proxy_prober import proxy_prober
+from services.search_jobs import search_scheduler
+from services.telegram_limiter import telegram_rate_limiter
+from services.webhook import run_webhook
+from services.worker_broker import worker_broker
 
 from handlers import user_handlers, admin_handlers, fsm_handlers
 
 async def main() -> None:
     await db.init_db()
-    await proxy_manager.load_proxies()
+    try:
+        await access_cache.load()
+        await http_client.start()
+        await proxy_manager.load_proxies()
+        proxy_prober.start()
+        gift_supply.start()
+        await worker_broker.start()
+        search_scheduler.start()
+        gift_indexer.start()
 
-    bot = Bot(
-        token=config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-    )
+        bot = Bot(
+            token=config.BOT_TOKEN,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        )
+        bot.session.middleware(telegram_rate_limiter)
 
-    dp = Dispatcher()
+        dp = Dispatcher()
 
-    dp.message.middleware(AccessMiddleware())
-    dp.callback_query.middleware(AccessMiddleware())
+        dp.message.middleware(AccessMiddleware())
+        dp.callback_query.middleware(AccessMiddleware())
 
-    dp.include_router(admin_handlers.router)
-    dp.include_router(user_handlers.router)
-    dp.include_router(fsm_handlers.router)
+        dp.include_router(admin_handlers.router)
+        dp.include_router(user_handlers.router)
+        dp.include_router(fsm_handlers.router)
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+        await fsm_handlers.resume_search_jobs(bot)
+
+        await metrics_server.start()
+        if config.WEBHOOK_URL:
+            await run_webhook(bot, dp)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
+    finally:
+        await gift_indexer.stop()
+        await search_scheduler.stop()
+        await metrics_server.stop()
+        await worker_broker.stop()
+        await gift_supply.stop()
+        await proxy_prober.stop()
+        await http_client.close()
+        await db.close_db()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
@@ -1,11 +1,12 @@
+import time
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware, Bot
 from aiogram.types import Message, CallbackQuery
-from aiogram.enums.chat_member_status import ChatMemberStatus
 
 import config
-import database as db
 from keyboards.inline import get_subscription_keyboard
+from services import metrics
+from services.access_cache import access_cache, fetch_membership
 
 
 class AccessMiddleware(BaseMiddleware):
@@ -15,31 +16,44 @@ class AccessMiddleware(BaseMiddleware):
             event: Message | CallbackQuery,
             data: Dict[str, Any]
     ) -> Any:
+        if not metrics.enabled:
+            allowed = await self._check(event, data)
+        else:
+            started = time.perf_counter()
+            allowed = await self._check(event, data)
+            metrics.middleware_seconds.observe(time.perf_counter() - started, "access")
+        if allowed:
+            return await handler(event, data)
+
+    async def _check(self, event: Message | CallbackQuery, data: Dict[str, Any]) -> bool:
         user_id = event.from_user.id
 
         if user_id == config.OWNER_ID:
-            return await handler(event, data)
+            return True
 
-        if await db.is_user_blocked(user_id):
-            return
+        if user_id in access_cache.blocked:
+            return False
 
-        channel_username = await db.get_subscription_channel()
+        channel_username = access_cache.channel
 
         if not channel_username:
-            return await handler(event, data)
+            return True
 
-        bot: Bot = data['bot']
+        # Кнопка "Проверить подписку" всегда идет мимо кэша, иначе только что подписавшийся ждал бы истечения TTL.
+        is_recheck = isinstance(event, CallbackQuery) and event.data == "check_subscription"
+        is_member = None if is_recheck else access_cache.get_membership(user_id)
+        if is_member is None:
+            bot: Bot = data['bot']
+            try:
+                is_member = await fetch_membership(bot, channel_username, user_id)
+                access_cache.set_membership(user_id, is_member)
+            except Exception:
+                is_member = False
+        # Обработчик кнопки берет свежий ответ отсюда, а не запрашивает get_chat_member второй раз.
+        data['is_member'] = is_member
 
-        try:
-            member = await bot.get_chat_member(chat_id=channel_username, user_id=user_id)
-            if member.status in [
-                ChatMemberStatus.MEMBER,
-                ChatMemberStatus.ADMINISTRATOR,
-                ChatMemberStatus.CREATOR
-            ]:
-                return await handler(event, data)
-        except Exception:
-            pass
+        if is_member:
+            return True
 
         text = f"Для использования бота необходимо подписаться на канал: {channel_username}"
         keyboard = get_subscription_keyboard(channel_username)
@@ -48,4 +62,5 @@ class AccessMiddleware(BaseMiddleware):
             await event.answer(text, reply_markup=keyboard)
         elif isinstance(event, CallbackQuery):
             await event.answer("Сначала подпишитесь на канал.", show_alert=True)
-            await event.message.answer(text, reply_markup=keyboard)
\ No newline at end of file
+            await event.message.answer(text, reply_markup=keyboard)
+        return False
@@ -0,0 +1,76 @@
+import time
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.enums.chat_member_status import ChatMemberStatus
+
+import config
+import database as db
+
+SUBSCRIBED_STATUSES = (
+    ChatMemberStatus.MEMBER,
+    ChatMemberStatus.ADMINISTRATOR,
+    ChatMemberStatus.CREATOR,
+)
+
+
+async def fetch_membership(bot: Bot, channel_username: str, user_id: int) -> bool:
+    member = await bot.get_chat_member(chat_id=channel_username, user_id=user_id)
+    return member.status in SUBSCRIBED_STATUSES
+
+
+class AccessCache:
+    def __init__(self, member_ttl: float, non_member_ttl: float, max_size: int):
+        self.member_ttl = member_ttl
+        self.non_member_ttl = non_member_ttl
+        self.max_size = max_size
+        self.blocked: set[int] = set()
+        self.channel: str | None = None
+        self._membership: OrderedDict[int, tuple[bool, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self):
+        self.blocked = set(await db.get_blocked_users())
+        self.channel = await db.get_subscription_channel()
+        self._membership.clear()
+
+    def block(self, user_id: int):
+        self.blocked.add(user_id)
+
+    def unblock(self, user_id: int):
+        self.blocked.discard(user_id)
+
+    def set_channel(self, channel_username: str | None):
+        self.channel = channel_username
+        self._membership.clear()
+
+    def get_membership(self, user_id: int) -> bool | None:
+        entry = self._membership.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                del self._membership[user_id]
+            self.misses += 1
+            return None
+        self._membership.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def set_membership(self, user_id: int, is_member: bool):
+        ttl = self.member_ttl if is_member else self.non_member_ttl
+        self._membership[user_id] = (is_member, time.monotonic() + ttl)
+        self._membership.move_to_end(user_id)
+        while len(self._membership) > self.max_size:
+            self._membership.popitem(last=False)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+access_cache = AccessCache(
+    member_ttl=config.SUBSCRIPTION_CACHE_TTL,
+    non_member_ttl=config.SUBSCRIPTION_NEGATIVE_CACHE_TTL,
+    max_size=config.SUBSCRIPTION_CACHE_SIZE,
+)
@@ -0,0 +1,96 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+
+import aiohttp
+
+
+class Overloaded(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+OVERLOAD_ERRORS = (Overloaded, asyncio.TimeoutError, aiohttp.ClientError, OSError)
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, min_limit: int, max_limit: int, latency_target: float, backoff: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def _acquire(self):
+        if self.in_flight >= self.limit or self._waiters:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release_slot()
+                raise
+            return
+        self.in_flight += 1
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        await self._acquire()
+        started_at = time.monotonic()
+        try:
+            yield
+        except OVERLOAD_ERRORS:
+            self._on_overload(started_at)
+            raise
+        else:
+            self._on_success(time.monotonic() - started_at)
+        finally:
+            self._release_slot()
+
+    def set_max_limit(self, max_limit: int):
+        self.max_limit = max(max_limit, self.min_limit)
+        self._limit = min(self._limit, self.max_limit)
+        self._wake()
+
+    def _on_success(self, latency: float):
+        # Аддитивный рост: примерно +1 к лимиту за каждое "окно" из limit успешных запросов.
+        if latency > self.latency_target or self._limit >= self.max_limit:
+            return
+        # Рост только при реальной загрузке: если лимит не выбирается, он ничего не говорит о пропускной способности.
+        if self.in_flight < self.limit:
+            return
+        self._limit = min(self._limit + 1 / self._limit, self.max_limit)
+        self.increases += 1
+        self._wake()
+
+    def _on_overload(self, started_at: float):
+        # Мультипликативное снижение не чаще раза на "окно": ошибки запросов, начатых до прошлого
+        # снижения, относятся к старому лимиту и повторно его не режут.
+        if started_at < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self._limit = max(self._limit * self.backoff, self.min_limit)
+        self.decreases += 1
@@ -0,0 +1,97 @@
+GIFTS = {
+    1: "Signet Ring", 2: "Skull Flower", 3: "Snow Mittens", 4: "Spiced Wine", 5: "Spy Agaric",
+    6: "Star Notepad", 7: "Swiss Watch", 8: "Trapped Heart", 9: "Vintage Cigar", 10: "Voodoo Doll",
+    11: "Witch Hat", 12: "Lunar Snake", 13: "Mad Pumpkin", 14: "Magic Potion", 15: "Mini Oscar",
+    16: "Party Sparkler", 17: "Perfume Bottle", 18: "Plush Pepe", 19: "Precious Peach", 20: "Santa Hat",
+    21: "Scared Cat", 22: "Sharp Tongue", 23: "Hex Pot", 24: "Homemade Cake", 25: "Hypno Lollipop",
+    26: "Ion Gem", 27: "Jelly Bunny", 28: "Jester Hat", 29: "Jingle Bells", 30: "Kissed Frog",
+    31: "Lol Pop", 32: "Love Candle", 33: "Cookie Heart", 34: "Crystal Ball", 35: "MOOO",
+    36: "Desk Calendar", 37: "Durovs Cap", 38: "Eternal Candle", 39: "Eternal Rose", 40: "Evil Eye",
+    41: "Flying Broom", 42: "Genie Lamp", 43: "Ginger Cookie", 44: "Sleigh Bell", 45: "Sakura Flower",
+    46: "Top Hat", 47: "Diamond Ring", 48: "Love Potion", 49: "Toy Bear", 50: "Loot Bag",
+    51: "Astral Shard", 52: "HAPPY", 53: "BdAy", 54: "BDay Candle", 55: "Berry Box",
+    56: "Bunny Muffin", 57: "Tama GadGet", 58: "Candy Cane", 59: "Snow Globe", 60: "Electric Skull",
+    61: "Winter Wreath", 62: "Neko Helmet", 63: "Record Player", 64: "Jack In The Box", 65: "Easter Egg",
+    66: "Holiday Drink", 67: "Xmas Stocking", 68: "Snake Box", 69: "Pet Snake", 70: "Big Year",
+    71: "Heart Locket", 72: "Bow Tie", 73: "Heroic Helmet", 74: "Nail Bracelet", 75: "Restless Jar",
+    76: "Light Sword", 77: "Gem Signet", 78: "Bonded Ring"
+}
+
+
+PAGE_SIZE = 10
+MIN_TRIGRAM_SCORE = 0.5
+MIN_SUGGESTION_SCORE = 0.3
+
+
+def gift_slug(gift_name: str) -> str:
+    return gift_name.replace(" ", "")
+
+
+def normalize(text: str) -> str:
+    return "".join(char for char in text.lower() if char.isalnum())
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Все, что нужно для выбора подарка, строится один раз при импорте и общее для всех пользователей.
+GIFT_NUMBERS = {name: number for number, name in GIFTS.items()}
+GIFT_PAGES = [
+    "\n".join(f"<code>{number}</code> - {name}" for number, name in list(GIFTS.items())[i:i + PAGE_SIZE])
+    for i in range(0, len(GIFTS), PAGE_SIZE)
+]
+_by_normalized: dict[str, str] = {}
+_by_prefix: dict[str, list[str]] = {}
+_by_trigram: dict[str, list[str]] = {}
+_trigram_counts: dict[str, int] = {}
+
+for _name in GIFTS.values():
+    _normalized = normalize(_name)
+    _by_normalized[_normalized] = _name
+    # Префиксы и полного названия, и каждого слова: "plush" и "pepe" оба находят Plush Pepe.
+    _prefixes = {_normalized[:i] for i in range(1, len(_normalized) + 1)}
+    for _word in _name.lower().split():
+        _prefixes.update(_word[:i] for i in range(1, len(_word) + 1))
+    for _prefix in _prefixes:
+        _by_prefix.setdefault(_prefix, []).append(_name)
+    _name_trigrams = trigrams(_normalized)
+    _trigram_counts[_name] = len(_name_trigrams)
+    for _trigram in _name_trigrams:
+        _by_trigram.setdefault(_trigram, []).append(_name)
+
+
+def _similar(normalized: str) -> list[tuple[float, str]]:
+    # Коэффициент Дайса по триграммам: кандидаты берутся только из списков триграмм запроса, без перебора каталога.
+    query_trigrams = trigrams(normalized)
+    common: dict[str, int] = {}
+    for trigram in query_trigrams:
+        for name in _by_trigram.get(trigram, ()):
+            common[name] = common.get(name, 0) + 1
+    scores = [(2 * count / (len(query_trigrams) + _trigram_counts[name]), name) for name, count in common.items()]
+    return sorted(scores, key=lambda item: (-item[0], GIFT_NUMBERS[item[1]]))
+
+
+def find_gift(query: str) -> tuple[str | None, list[str]]:
+    # Возвращает найденный подарок или, если однозначного совпадения нет, до трех подсказок.
+    query = query.strip()
+    # isdecimal, а не isdigit: "²" - цифра, но int() ее не разбирает.
+    if query.isdecimal():
+        return GIFTS.get(int(query)), []
+    normalized = normalize(query)
+    if not normalized:
+        return None, []
+    if normalized in _by_normalized:
+        return _by_normalized[normalized], []
+
+    candidates = _by_prefix.get(normalized, [])
+    if len(candidates) == 1:
+        return candidates[0], []
+    if candidates:
+        return None, sorted(candidates, key=GIFT_NUMBERS.get)[:3]
+
+    similar = _similar(normalized)
+    if similar and similar[0][0] >= MIN_TRIGRAM_SCORE and (len(similar) == 1 or similar[0][0] > similar[1][0]):
+        return similar[0][1], []
+    return None, [name for score, name in similar[:3] if score >= MIN_SUGGESTION_SCORE]
@@ -0,0 +1,125 @@
+import logging
+import time
+
+import config
+import database as db
+from services import metrics
+from services.adaptive_limiter import AdaptiveLimiter, Overloaded
+from services.gift_parser import GiftRecord, extract_gift, has_gift_table
+from services.http_client import http_client
+from services.proxy_manager import display_proxy, proxy_manager
+from services.shard_queue import shard_queue
+from services.single_flight import BatchFlight, SingleFlight
+
+gift_fetches = SingleFlight()
+# Номера, которые уже ушли воркерам в шарде другого поиска, не раздаются второй раз.
+shard_fetches = BatchFlight()
+fetch_limiter = AdaptiveLimiter(
+    initial=config.FETCH_INITIAL_CONCURRENCY,
+    min_limit=config.FETCH_MIN_CONCURRENCY,
+    max_limit=config.SEARCH_CONCURRENCY,
+    latency_target=config.FETCH_LATENCY_TARGET,
+)
+
+
+def gift_url(slug: str, number: int) -> str:
+    return f"{config.GIFT_BASE_URL}/{slug}-{number}"
+
+
+async def parse_gift_data(slug: str, number: int) -> GiftRecord | None:
+    return await gift_fetches.do((slug, number), lambda: _fetch_gift_data(slug, number))
+
+
+def _cached_record(url: str, cached: tuple) -> GiftRecord | None:
+    owner, model, backdrop, symbol = cached
+    if owner is None:
+        return None
+    return GiftRecord(url=url, owner=owner, model=model, backdrop=backdrop, symbol=symbol)
+
+
+async def _fetch_gift_data(slug: str, number: int) -> GiftRecord | None:
+    url = gift_url(slug, number)
+    cached = await db.get_gift_page(slug, number, config.GIFT_CACHE_TTL, config.GIFT_CACHE_NEGATIVE_TTL)
+    if cached is not None:
+        return _cached_record(url, cached)
+
+    status, record = await fetch_gift_page(slug, number)
+    if status is not None:
+        await db.save_gift_page(slug, number, status, record)
+    return record
+
+
+async def fetch_gift_page(slug: str, number: int) -> tuple[int | None, GiftRecord | None]:
+    url = gift_url(slug, number)
+    proxy = await proxy_manager.get_proxy()
+    try:
+        session = http_client.session(proxy)
+    except Exception:
+        logging.error(f"Неверный формат прокси: {proxy}")
+        proxy = None
+        session = http_client.session(None)
+
+    started_at = None
+    try:
+        async with proxy_manager.slot(proxy), fetch_limiter.slot():
+            started_at = time.monotonic()
+            async with session.get(url, timeout=15, allow_redirects=False) as response:
+                # Ответ "слишком много запросов" и ошибки сервера не кэшируются, а снижают лимиты.
+                if response.status == 429 or response.status >= 500:
+                    raise Overloaded(response.status)
+                if proxy:
+                    proxy_manager.report_success(proxy, time.monotonic() - started_at)
+                status = response.status
+                record = None
+                if status == 200:
+                    html_text = await response.text()
+                    if metrics.enabled:
+                        parse_started = time.perf_counter()
+                        record = extract_gift(url, html_text)
+                        metrics.parse_seconds.observe(time.perf_counter() - parse_started)
+                    else:
+                        record = extract_gift(url, html_text)
+                    # Для несуществующего номера t.me отдает 200 без карточки подарка. В кэш такая
+                    # страница пишется как 404, чтобы отличать ее от подарка со скрытым владельцем.
+                    if record is None and not has_gift_table(html_text):
+                        status = 404
+                if metrics.enabled:
+                    metrics.fetch_seconds.observe(time.monotonic() - started_at, "ok")
+                    if proxy:
+                        metrics.proxy_requests_total.inc(display_proxy(proxy), "success")
+                return status, record
+    except Exception as e:
+        # Ошибка 5xx - сбой самого t.me, прокси в ней не виноват и на отдых не отправляется.
+        if proxy and not (isinstance(e, Overloaded) and e.status >= 500):
+            proxy_manager.report_failure(proxy)
+        if metrics.enabled:
+            if started_at is not None:
+                metrics.fetch_seconds.observe(time.monotonic() - started_at, "error")
+            if proxy:
+                metrics.proxy_requests_total.inc(display_proxy(proxy), "failure")
+        logging.debug(f"Ошибка при парсинге {url}: {e}")
+        return None, None
+
+
+async def fetch_gift_shard(slug: str, numbers: list[int]) -> list[GiftRecord | None]:
+    # Кэш проверяется здесь, а воркерам уходят только номера, которых в нем нет.
+    cached = await db.get_gift_pages(
+        slug, numbers[0], numbers[-1], config.GIFT_CACHE_TTL, config.GIFT_CACHE_NEGATIVE_TTL)
+    records = {number: _cached_record(gift_url(slug, number), cached[number]) for number in numbers if number in cached}
+    missing = [number for number in numbers if number not in cached]
+    if missing:
+        found = await shard_fetches.do([(slug, number) for number in missing], lambda keys: _run_shard(slug, keys))
+        records.update((number, record) for (_, number), record in found.items())
+    return [records.get(number) for number in numbers]
+
+
+async def _run_shard(slug: str, keys: list[tuple[str, int]]) -> dict[tuple[str, int], GiftRecord | None]:
+    records = {}
+    for number, status, owner, model, backdrop, symbol in await shard_queue.run(slug, [number for _, number in keys]):
+        record = None
+        if owner is not None:
+            record = GiftRecord(url=gift_url(slug, number), owner=owner, model=model, backdrop=backdrop, symbol=symbol)
+        if status is not None:
+            await db.save_gift_page(slug, number, status, record)
+        records[(slug, number)] = record
+    return records
@@ -0,0 +1,53 @@
+from typing import Iterable
+
+from services.gift_parser import GiftRecord
+
+PREFIX_MARK = "*"
+
+
+class AttributeMatcher:
+    def __init__(self, terms: Iterable[str]):
+        exact = set()
+        prefixes = set()
+        for term in terms:
+            term = term.strip().lower()
+            if term.endswith(PREFIX_MARK):
+                term = term.rstrip(PREFIX_MARK).strip()
+                if term:
+                    prefixes.add(term)
+            elif term:
+                exact.add(term)
+        self.exact = frozenset(exact)
+        self.prefixes = tuple(sorted(prefixes))
+
+    def __bool__(self) -> bool:
+        return bool(self.exact or self.prefixes)
+
+    def matches(self, value: str) -> bool:
+        value = value.lower()
+        return value in self.exact or (bool(self.prefixes) and value.startswith(self.prefixes))
+
+
+class GiftFilter:
+    def __init__(
+            self,
+            models: Iterable[str] = (),
+            backgrounds: Iterable[str] = (),
+            patterns: Iterable[str] = (),
+            blacklist: Iterable[str] = ()
+    ):
+        self.models = AttributeMatcher(models)
+        self.backgrounds = AttributeMatcher(backgrounds)
+        self.patterns = AttributeMatcher(patterns)
+        self.blacklist = frozenset(username.lower() for username in blacklist)
+
+    def matches(self, record: GiftRecord) -> bool:
+        if record.owner.lower() in self.blacklist:
+            return False
+        if self.models and not self.models.matches(record.model):
+            return False
+        if self.backgrounds and not self.backgrounds.matches(record.backdrop):
+            return False
+        if self.patterns and not self.patterns.matches(record.symbol):
+            return False
+        return True
@@ -0,0 +1,158 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable
+
+import config
+import database as db
+from services.gift_catalog import GIFTS, gift_slug
+from services.gift_fetcher import fetch_gift_shard, gift_url, parse_gift_data
+from services.gift_filter import GiftFilter
+from services.gift_parser import GiftRecord
+from services.search_jobs import WORKERS_ENABLED
+
+MISSING_SCAN_CHUNK = 5000
+
+
+async def search_index(slug: str, start_id: int, end_id: int, gift_filter: GiftFilter,
+                       max_age: float) -> list[tuple[str, str]] | None:
+    # Индекс годится, только если каждый номер диапазона в нем есть и не старше max_age.
+    fresh = await db.count_gift_pages(slug, start_id, end_id, fetched_after=time.time() - max_age)
+    if fresh < end_id - start_id + 1:
+        return None
+
+    # Точные значения самого узкого фильтра отбираются по индексу, остальное проверяет GiftFilter.
+    column, values = None, []
+    if gift_filter.models and not gift_filter.models.prefixes:
+        column, values = "model", sorted(gift_filter.models.exact)
+    elif gift_filter.backgrounds and not gift_filter.backgrounds.prefixes:
+        column, values = "backdrop", sorted(gift_filter.backgrounds.exact)
+
+    found = []
+    for number, owner, model, backdrop, symbol in await db.query_gift_pages(slug, start_id, end_id, column, values):
+        record = GiftRecord(url=gift_url(slug, number), owner=owner, model=model, backdrop=backdrop, symbol=symbol)
+        if gift_filter.matches(record):
+            found.append((record.url, record.owner))
+    return found
+
+
+class GiftIndexer:
+    def __init__(
+            self,
+            fetch: Callable[[str, int], Awaitable[GiftRecord | None]],
+            requests_per_minute: int,
+            concurrency: int,
+            refresh_age: float,
+            interval: float = 60.0,
+            fetch_batch: Callable[[str, list[int]], Awaitable[list[GiftRecord | None]]] | None = None,
+            batch_size: int = 1
+    ):
+        self.fetch = fetch
+        self.requests_per_minute = requests_per_minute
+        self.concurrency = concurrency
+        self.refresh_age = refresh_age
+        self.interval = interval
+        self.fetch_batch = fetch_batch
+        self.batch_size = batch_size
+        self.indexed = 0
+        self._missing_cursor: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def budget(self) -> int:
+        return int(self.requests_per_minute * self.interval / 60)
+
+    async def _missing(self, slug: str, supply: int, limit: int) -> list[int]:
+        if await db.count_gift_pages(slug, 1, supply) >= supply:
+            return []
+        # Пропуски ищутся окнами по номерам с места прошлой остановки, чтобы не сканировать всю коллекцию каждый раз.
+        missing = []
+        start = self._missing_cursor.get(slug, 1)
+        scanned = 0
+        while len(missing) < limit and scanned < supply:
+            end = min(start + MISSING_SCAN_CHUNK - 1, supply)
+            known = await db.get_gift_page_numbers(slug, start, end)
+            missing.extend(number for number in range(start, end + 1) if number not in known)
+            scanned += end - start + 1
+            start = end + 1 if end < supply else 1
+        self._missing_cursor[slug] = missing[limit] if len(missing) > limit else start
+        return missing[:limit]
+
+    async def _collect(self, budget: int) -> dict[str, list[int]]:
+        fetched_before = time.time() - self.refresh_age
+        candidates = []
+        for name in GIFTS.values():
+            slug = gift_slug(name)
+            row = await db.get_gift_supply(slug)
+            if row is None:
+                continue
+            supply = row[0]
+            # Отсутствующие номера считаются самыми старыми; ранг чередует коллекции, чтобы ни одна не ждала остальных.
+            for rank, number in enumerate(await self._missing(slug, supply, budget)):
+                candidates.append((0.0, rank, slug, number))
+            for number, fetched_at in await db.get_stale_gift_pages(slug, supply, fetched_before, budget):
+                candidates.append((fetched_at, 0, slug, number))
+
+        batches: dict[str, list[int]] = {}
+        for _, _, slug, number in heapq.nsmallest(budget, candidates):
+            batches.setdefault(slug, []).append(number)
+        return {slug: sorted(numbers) for slug, numbers in batches.items()}
+
+    async def _fetch(self, batches: dict[str, list[int]]):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(slug: str, numbers: list[int]):
+            async with semaphore:
+                try:
+                    if self.fetch_batch is not None:
+                        await self.fetch_batch(slug, numbers)
+                    else:
+                        await self.fetch(slug, numbers[0])
+                    self.indexed += len(numbers)
+                except Exception as e:
+                    logging.error(f"Ошибка индексации {slug}-{numbers[0]}: {e}")
+
+        size = self.batch_size if self.fetch_batch is not None else 1
+        await asyncio.gather(*(
+            fetch(slug, numbers[i:i + size]) for slug, numbers in batches.items() for i in range(0, len(numbers), size)
+        ))
+
+    async def run_once(self) -> int:
+        batches = await self._collect(self.budget)
+        await self._fetch(batches)
+        return sum(len(numbers) for numbers in batches.values())
+
+    async def _run(self):
+        while True:
+            started_at = time.monotonic()
+            try:
+                count = await self.run_once()
+                if count:
+                    logging.info(f"Индексатор обновил {count} страниц за {time.monotonic() - started_at:.1f} сек.")
+            except Exception as e:
+                logging.error(f"Ошибка индексатора: {e}")
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started_at), 0))
+
+    def start(self):
+        if self._task is None and self.requests_per_minute > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+gift_indexer = GiftIndexer(
+    fetch=parse_gift_data,
+    requests_per_minute=config.GIFT_INDEX_REQUESTS_PER_MINUTE,
+    concurrency=config.GIFT_INDEX_CONCURRENCY,
+    refresh_age=config.GIFT_CACHE_TTL,
+    fetch_batch=fetch_gift_shard if WORKERS_ENABLED else None,
+    batch_size=config.SHARD_SIZE,
+)
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+
+from lxml import html as lxml_html
+
+
+@dataclass(frozen=True, slots=True)
+class GiftRecord:
+    url: str
+    owner: str
+    model: str
+    backdrop: str
+    symbol: str
+
+
+GIFT_TABLE_MARKER = "tgme_gift_table"
+
+
+def has_gift_table(html_text: str) -> bool:
+    return GIFT_TABLE_MARKER in html_text
+
+
+def _find_gift_table(html_text: str) -> str | None:
+    marker = html_text.find(GIFT_TABLE_MARKER)
+    if marker == -1:
+        return None
+    start = html_text.rfind("<table", 0, marker)
+    end = html_text.find("</table>", marker)
+    if start == -1 or end == -1:
+        return None
+    return html_text[start:end + len("</table>")]
+
+
+def _cell_text(cell) -> str:
+    # Процент редкости лежит в <mark> внутри ячейки, в значение атрибута он не входит.
+    for mark in cell.findall(".//mark"):
+        mark.drop_tree()
+    return " ".join(cell.text_content().split())
+
+
+def extract_gift(url: str, html_text: str) -> GiftRecord | None:
+    table_html = _find_gift_table(html_text)
+    if table_html is None:
+        return None
+
+    try:
+        table = lxml_html.fragment_fromstring(table_html)
+    except Exception:
+        return None
+
+    cells = {}
+    for row in table.iter("tr"):
+        header = row.find("th")
+        cell = row.find("td")
+        if header is not None and cell is not None:
+            cells[header.text_content().strip()] = cell
+
+    owner_cell = cells.get("Owner")
+    if owner_cell is None:
+        return None
+    owner_link = owner_cell.find(".//a")
+    if owner_link is None or not owner_link.get("href"):
+        return None
+
+    return GiftRecord(
+        url=url,
+        owner="@" + owner_link.get("href").replace("https://t.me/", ""),
+        model=_cell_text(cells["Model"]) if "Model" in cells else "",
+        backdrop=_cell_text(cells["Backdrop"]) if "Backdrop" in cells else "",
+        symbol=_cell_text(cells["Symbol"]) if "Symbol" in cells else "",
+    )
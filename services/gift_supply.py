@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+
+import config
+import database as db
+from services.gift_catalog import GIFTS, gift_slug
+from services.gift_fetcher import fetch_gift_page
+from services.single_flight import SingleFlight
+
+PAGE_ATTEMPTS = 3
+
+
+class SupplyProbeError(Exception):
+    pass
+
+
+async def page_exists(slug: str, number: int) -> bool:
+    status = await db.get_gift_page_status(slug, number, config.GIFT_CACHE_TTL, config.GIFT_CACHE_NEGATIVE_TTL)
+    if status is not None:
+        return status == 200
+    for _ in range(PAGE_ATTEMPTS):
+        status, record = await fetch_gift_page(slug, number)
+        if status is not None:
+            await db.save_gift_page(slug, number, status, record)
+            return status == 200
+    raise SupplyProbeError(f"не удалось загрузить {slug}-{number}")
+
+
+async def find_supply(slug: str, known: int = 0) -> int:
+    # Номера выдаются подряд, поэтому последний существующий ищется за ~2*log2(тираж) запросов:
+    # сначала шагами, удваивающимися от известного тиража, затем бинарным поиском внутри последнего шага.
+    lo = known if known and await page_exists(slug, known) else 0
+    step = max(lo, 1)
+    hi = lo + step
+    while await page_exists(slug, hi):
+        lo, step = hi, step * 2
+        hi = lo + step
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if await page_exists(slug, mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+class GiftSupply:
+    def __init__(self, refresh_interval: float, concurrency: int, wait_timeout: float):
+        self.refresh_interval = refresh_interval
+        self.concurrency = concurrency
+        self.wait_timeout = wait_timeout
+        self._probes = SingleFlight()
+        self._task: asyncio.Task | None = None
+        self._prefetches: set[asyncio.Task] = set()
+
+    async def refresh(self, slug: str) -> int:
+        return await self._probes.do(slug, lambda: self._probe(slug))
+
+    async def _probe(self, slug: str) -> int:
+        row = await db.get_gift_supply(slug)
+        started_at = time.monotonic()
+        supply = await find_supply(slug, known=row[0] if row else 0)
+        await db.save_gift_supply(slug, supply)
+        logging.info(f"Тираж {slug}: {supply} (проверен за {time.monotonic() - started_at:.1f} сек.)")
+        return supply
+
+    async def cached(self, slug: str) -> int | None:
+        row = await db.get_gift_supply(slug)
+        if row is not None and time.time() - row[1] < self.refresh_interval:
+            return row[0]
+        return None
+
+    def prefetch(self, slug: str):
+        # Тираж начинает определяться заранее, а get() потом присоединяется к той же проверке.
+        task = asyncio.create_task(self._prefetch(slug))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    async def _prefetch(self, slug: str):
+        try:
+            await self.refresh(slug)
+        except SupplyProbeError as e:
+            logging.warning(f"Не удалось определить тираж {slug}: {e}")
+        except Exception as e:
+            logging.error(f"Ошибка при определении тиража {slug}: {e}")
+
+    async def get(self, slug: str) -> int | None:
+        row = await db.get_gift_supply(slug)
+        if row is not None and time.time() - row[1] < self.refresh_interval:
+            return row[0]
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.refresh(slug)), self.wait_timeout)
+        except (asyncio.TimeoutError, SupplyProbeError) as e:
+            logging.warning(f"Не удалось быстро определить тираж {slug}: {str(e) or 'таймаут'}")
+            return row[0] if row else None
+
+    async def refresh_stale(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(slug: str):
+            async with semaphore:
+                row = await db.get_gift_supply(slug)
+                if row is not None and time.time() - row[1] < self.refresh_interval:
+                    return
+                try:
+                    await self.refresh(slug)
+                except SupplyProbeError as e:
+                    logging.warning(f"Не удалось определить тираж {slug}: {e}")
+
+        await asyncio.gather(*(refresh(gift_slug(name)) for name in GIFTS.values()))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh_stale()
+            except Exception as e:
+                logging.error(f"Ошибка фонового обновления тиражей: {e}")
+            await asyncio.sleep(self.refresh_interval / 4)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._prefetches):
+            task.cancel()
+        await asyncio.gather(*self._prefetches, return_exceptions=True)
+
+
+gift_supply = GiftSupply(
+    refresh_interval=config.GIFT_SUPPLY_REFRESH_INTERVAL,
+    concurrency=config.GIFT_SUPPLY_PROBE_CONCURRENCY,
+    wait_timeout=config.GIFT_SUPPLY_WAIT_TIMEOUT,
+)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Iterable
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp_socks import ProxyConnector
+
+import config
+
+PROXY_SCHEMES = ("socks5", "socks4", "http", "https")
+
+
+def proxy_to_url(proxy: str) -> str:
+    if "://" in proxy:
+        return proxy
+    ip, port, login, password = proxy.split(":")
+    return f"socks5://{login}:{password}@{ip}:{port}"
+
+
+def is_valid_proxy(proxy: str) -> bool:
+    try:
+        url = urlsplit(proxy_to_url(proxy))
+        return url.scheme in PROXY_SCHEMES and bool(url.hostname) and url.port is not None
+    except ValueError:
+        return False
+
+
+class HttpClient:
+    def __init__(self, pool_limit: int, keepalive_timeout: float, dns_cache_ttl: int):
+        self.pool_limit = pool_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: dict[str | None, aiohttp.ClientSession] = {}
+
+    async def start(self):
+        self.session(None)
+        logging.info("HTTP-клиент запущен.")
+
+    def _make_connector(self, proxy: str | None) -> aiohttp.BaseConnector:
+        options = dict(
+            limit=self.pool_limit,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        if proxy is None:
+            return aiohttp.TCPConnector(**options)
+        return ProxyConnector.from_url(proxy_to_url(proxy), rdns=True, **options)
+
+    def session(self, proxy: str | None) -> aiohttp.ClientSession:
+        session = self._sessions.get(proxy)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(connector=self._make_connector(proxy))
+            self._sessions[proxy] = session
+        return session
+
+    async def close_unused(self, proxies: Iterable[str]):
+        keep = set(proxies)
+        stale = [proxy for proxy in self._sessions if proxy is not None and proxy not in keep]
+        await asyncio.gather(*(self._sessions.pop(proxy).close() for proxy in stale))
+
+    async def close(self):
+        sessions = list(self._sessions.values())
+        self._sessions = {}
+        await asyncio.gather(*(session.close() for session in sessions))
+        logging.info("HTTP-клиент остановлен.")
+
+
+http_client = HttpClient(
+    pool_limit=config.HTTP_POOL_LIMIT,
+    keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl=config.HTTP_DNS_CACHE_TTL,
+)
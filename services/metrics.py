@@ -0,0 +1,206 @@
+import bisect
+import logging
+import time
+from typing import Callable
+
+from aiohttp import web
+
+import config
+
+# Горячие пути проверяют этот флаг до замеров времени, поэтому выключенные метрики почти ничего не стоят.
+enabled: bool = config.METRICS_ENABLED
+started_at = time.monotonic()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+CPU_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in self.values.items()]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        return [f"{self.name} {self.callback()}"]
+
+
+class HistogramSeries:
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.count = 0
+        self.total = 0.0
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...], labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labelnames = labelnames
+        self.series: dict[tuple, HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.count += 1
+        series.total += value
+
+    def merged(self) -> HistogramSeries:
+        merged = HistogramSeries(len(self.buckets) + 1)
+        for series in self.series.values():
+            merged.counts = [a + b for a, b in zip(merged.counts, series.counts)]
+            merged.count += series.count
+            merged.total += series.total
+        return merged
+
+    def quantile(self, q: float, series: HistogramSeries | None = None) -> float | None:
+        series = series or self.merged()
+        if not series.count:
+            return None
+        # Оценка по корзинам с линейной интерполяцией внутри корзины, как histogram_quantile в Prometheus.
+        rank = q * series.count
+        seen = 0
+        for index, count in enumerate(series.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self) -> list[str]:
+        lines = []
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                bucket_labels = _labels(self.labelnames, labels, 'le="' + str(bound) + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {series.count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series.total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Counter | Gauge | Histogram] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logging.error(f"Ошибка при выгрузке метрики {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+fetch_seconds = registry.register(Histogram(
+    "gifthunter_fetch_seconds", "Загрузка страницы подарка с t.me", LATENCY_BUCKETS, ("result",)))
+parse_seconds = registry.register(Histogram(
+    "gifthunter_parse_seconds", "Разбор HTML страницы подарка", CPU_BUCKETS))
+filter_seconds = registry.register(Histogram(
+    "gifthunter_filter_seconds", "Проверка подарка фильтрами поиска", CPU_BUCKETS))
+pages_total = registry.register(Counter(
+    "gifthunter_pages_total", "Проверенные номера по результату", ("result",)))
+proxy_requests_total = registry.register(Counter(
+    "gifthunter_proxy_requests_total", "Запросы через прокси по результату", ("proxy", "result")))
+telegram_api_seconds = registry.register(Histogram(
+    "gifthunter_telegram_api_seconds", "Вызовы Bot API", LATENCY_BUCKETS, ("method",)))
+telegram_wait_seconds = registry.register(Histogram(
+    "gifthunter_telegram_wait_seconds", "Ожидание в ограничителе исходящих сообщений", LATENCY_BUCKETS))
+middleware_seconds = registry.register(Histogram(
+    "gifthunter_middleware_seconds", "Время в middleware до вызова обработчика", CPU_BUCKETS + (0.25, 1.0),
+    ("middleware",)))
+
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], float]):
+    registry.register(Gauge(name, help_text, callback))
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def _health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok", "uptime": round(time.monotonic() - started_at, 1)})
+
+
+def add_routes(app: web.Application, with_metrics: bool = True):
+    app.router.add_get("/health", _health)
+    if enabled and with_metrics:
+        app.router.add_get("/metrics", _metrics)
+
+
+class MetricsServer:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def start(self):
+        if not self.port:
+            return
+        app = web.Application()
+        add_routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Метрики и проверка здоровья доступны на http://{self.host}:{self.port}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics_server = MetricsServer(host=config.METRICS_HOST, port=config.METRICS_PORT)
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import config
+
+MAX_STACK_DEPTH = 64
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    short = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    return f"{short}:{code.co_name}"
+
+
+def collapse_stack(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def await_chain(coro) -> str:
+    # Цепочка cr_await показывает, на чем сейчас стоит задача: замок, семафор, сеть или база.
+    names = []
+    while coro is not None and len(names) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        names.append(f"{_frame_name(frame)}:{frame.f_lineno}")
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return ";".join(names)
+
+
+def _percentile(values: list[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+@dataclass
+class ProfileResult:
+    duration: float
+    interval: float
+    block_threshold: float
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+    lags: list[float] = field(default_factory=list)
+    blocks: list[tuple[float, str]] = field(default_factory=list)
+    awaits: Counter = field(default_factory=Counter)
+    task_counts: list[int] = field(default_factory=list)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> str:
+        blocked = sum(duration for duration, _ in self.blocks)
+        return (
+            f"Профиль за {self.duration:.0f} сек.: {self.samples} сэмплов.\n"
+            f"Задержка цикла: p50 {_percentile(self.lags, 0.5) * 1000:.1f} мс, "
+            f"p95 {_percentile(self.lags, 0.95) * 1000:.1f} мс, max {max(self.lags, default=0) * 1000:.0f} мс.\n"
+            f"Блокировок дольше {self.block_threshold * 1000:.0f} мс: {len(self.blocks)}, всего {blocked:.2f} сек.\n"
+            f"Задач в среднем: {sum(self.task_counts) / max(len(self.task_counts), 1):.0f}"
+        )
+
+    def report(self) -> str:
+        lines = [self.summary(), ""]
+
+        lines.append("== Самые долгие блокировки цикла (стек в момент обнаружения) ==")
+        for duration, stack in sorted(self.blocks, reverse=True)[:20]:
+            lines.append(f"{duration * 1000:8.0f} мс  {' <- '.join(reversed(stack.split(';')[-6:]))}")
+
+        # Собственное время функции - сэмплы, где она на вершине стека; включительное - где она есть вообще.
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        total = max(self.samples, 1)
+        lines += ["", "== Функции по собственному времени в потоке цикла =="]
+        lines += [f"{count / total * 100:6.1f}%  {name}" for name, count in own.most_common(30)]
+        lines += ["", "== Функции по включительному времени =="]
+        lines += [f"{count / total * 100:6.1f}%  {name}" for name, count in inclusive.most_common(30)]
+
+        snapshots = max(len(self.task_counts), 1)
+        lines += ["", "== Где ждут задачи (среднее число задач в точке ожидания) =="]
+        for chain, count in self.awaits.most_common(30):
+            lines.append(f"{count / snapshots:8.1f}  {' -> '.join(chain.split(';')[-4:])}")
+        return "\n".join(lines) + "\n"
+
+
+class LoopProfiler:
+    def __init__(self, interval: float, block_threshold: float, task_snapshot_interval: float = 0.5):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.task_snapshot_interval = task_snapshot_interval
+        self._lock = asyncio.Lock()
+        self._heartbeat = 0.0
+        self._block_stack: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _sample(self, thread_id: int, result: ProfileResult, stop: threading.Event):
+        # Поток-сэмплер снимает стек потока цикла, не трогая сам цикл. Если цикл давно не отмечался,
+        # стек в этот момент и есть то, что его блокирует.
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = collapse_stack(frame)
+            result.stacks[stack] += 1
+            result.samples += 1
+            if self._block_stack is None and time.monotonic() - self._heartbeat > self.block_threshold:
+                self._block_stack = stack
+
+    async def _watch_loop(self, result: ProfileResult, tick: float):
+        next_snapshot = 0.0
+        while True:
+            expected = time.monotonic() + tick
+            await asyncio.sleep(tick)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            self._heartbeat = now
+            result.lags.append(lag)
+            if lag >= self.block_threshold:
+                result.blocks.append((lag, self._block_stack or "стек не пойман"))
+            self._block_stack = None
+            if now >= next_snapshot:
+                next_snapshot = now + self.task_snapshot_interval
+                tasks = asyncio.all_tasks()
+                result.task_counts.append(len(tasks))
+                for task in tasks:
+                    result.awaits[await_chain(task.get_coro())] += 1
+
+    async def run(self, seconds: float) -> ProfileResult:
+        async with self._lock:
+            result = ProfileResult(duration=seconds, interval=self.interval, block_threshold=self.block_threshold)
+            self._heartbeat = time.monotonic()
+            self._block_stack = None
+            stop = threading.Event()
+            sampler = threading.Thread(
+                target=self._sample, args=(threading.get_ident(), result, stop), name="loop-profiler", daemon=True)
+            watcher = asyncio.create_task(self._watch_loop(result, tick=min(self.block_threshold / 2, 0.05)))
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                watcher.cancel()
+                try:
+                    await watcher
+                except asyncio.CancelledError:
+                    pass
+                await asyncio.to_thread(sampler.join)
+            return result
+
+
+profiler = LoopProfiler(interval=config.PROFILE_SAMPLE_INTERVAL, block_threshold=config.PROFILE_BLOCK_THRESHOLD)
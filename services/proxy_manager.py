@@ -1,45 +1,253 @@
 import asyncio
+import contextlib
+import heapq
+import itertools
 import logging
 import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import config
 import database as db
+from services.adaptive_limiter import AdaptiveLimiter
+from services.http_client import http_client, proxy_to_url
+
+MIN_SUCCESS_RATE = 0.05
+MIN_LATENCY = 0.05
+# Сколько занятых прокси (лимит выбран) выбор пропускает в поисках свободного, прежде чем взять лучший из занятых.
+BUSY_SKIP_LIMIT = 32
+
+
+@dataclass
+class ProxyState:
+    proxy: str
+    success_rate: float = 1.0
+    latency: float = 1.0
+    failure_streak: int = 0
+    available_at: float = 0.0
+    pass_value: float = 0.0
+    epoch: int = 0
+
+    @property
+    def weight(self) -> float:
+        return max(self.success_rate, MIN_SUCCESS_RATE) / max(self.latency, MIN_LATENCY)
+
+
+def display_proxy(proxy: str) -> str:
+    # Только хост и порт: строка идет в логи, метки метрик и /stats, логин и пароль туда попадать не должны.
+    try:
+        url = urlsplit(proxy_to_url(proxy))
+        return f"{url.hostname}:{url.port}"
+    except ValueError:
+        return "некорректный прокси"
+
 
 class ProxyManager:
-    def __init__(self, cooldown_seconds: int):
+    def __init__(self, cooldown_seconds: int, max_cooldown_seconds: int, proxy_concurrency: int, ewma_alpha: float = 0.2,
+                 initial_concurrency: int = 2, latency_target: float = 5.0):
         self.proxies = []
         self.cooldown_seconds = cooldown_seconds
-        self.cooldowns = {}
-        self.current_index = 0
-        self._lock = asyncio.Lock()
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.proxy_concurrency = proxy_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.latency_target = latency_target
+        self.ewma_alpha = ewma_alpha
+        self.states: dict[str, ProxyState] = {}
+        # Готовые прокси упорядочены по "виртуальному времени" (stride scheduling): каждая выдача
+        # сдвигает прокси на 1/вес, поэтому быстрые и надежные прокси выдаются пропорционально чаще.
+        # Записи с устаревшим epoch пропускаются при извлечении вместо удаления из кучи.
+        self._ready: list[tuple[float, int, int, str]] = []
+        self._cooling: list[tuple[float, int, int, str]] = []
+        self._global_pass = 0.0
+        self._seq = itertools.count()
+        self._wait_logged_until = 0.0
+        self.limiters: dict[str, AdaptiveLimiter] = {}
 
     async def load_proxies(self):
         logging.info("Загрузка списка прокси из БД...")
-        self.proxies = await db.get_all_proxies()
-        self.current_index = 0
-        self.cooldowns = {}
+        self.set_proxies(await db.get_all_proxies())
+        self.seed_stats(await db.get_proxy_stats())
+        await http_client.close_unused(self.proxies)
         if not self.proxies:
             logging.warning("Список прокси пуст! Парсинг может не работать.")
         else:
             logging.info(f"Загружено {len(self.proxies)} прокси.")
 
+    def set_proxies(self, proxies: list[str]):
+        self.proxies = list(proxies)
+        self.states = {proxy: ProxyState(proxy) for proxy in self.proxies}
+        self._ready = []
+        self._cooling = []
+        self._global_pass = 0.0
+        # Лимиты оставшихся прокси сохраняются: перезагрузка списка не должна сбрасывать подобранную параллельность.
+        self.limiters = {proxy: limiter for proxy, limiter in self.limiters.items() if proxy in self.states}
+        for state in self.states.values():
+            self._push_ready(state)
+
+    def add_proxies(self, proxies: list[str]):
+        for proxy in proxies:
+            if proxy in self.states:
+                continue
+            self.proxies.append(proxy)
+            state = self.states[proxy] = ProxyState(proxy)
+            self._push_ready(state)
+
+    async def remove_proxies(self, proxies: list[str]):
+        # Записи удаленных прокси остаются в кучах и отбрасываются при извлечении, как устаревшие.
+        removed = set(proxies)
+        self.proxies = [proxy for proxy in self.proxies if proxy not in removed]
+        for proxy in removed:
+            self.states.pop(proxy, None)
+            self.limiters.pop(proxy, None)
+        await http_client.close_unused(self.proxies)
+
+    def set_proxy_concurrency(self, proxy_concurrency: int):
+        self.proxy_concurrency = proxy_concurrency
+        for limiter in self.limiters.values():
+            limiter.set_max_limit(proxy_concurrency)
+
+    def seed_stats(self, stats: list[tuple]):
+        for proxy, latency_ms, success_count, failure_count, _ in stats:
+            state = self.states.get(proxy)
+            if state is None:
+                continue
+            if latency_ms is not None:
+                state.latency = latency_ms / 1000
+            if success_count + failure_count:
+                state.success_rate = success_count / (success_count + failure_count)
+
+    def _push_ready(self, state: ProxyState):
+        state.epoch += 1
+        state.pass_value = max(state.pass_value, self._global_pass)
+        heapq.heappush(self._ready, (state.pass_value, next(self._seq), state.epoch, state.proxy))
+
+    def _push_cooling(self, state: ProxyState):
+        state.epoch += 1
+        heapq.heappush(self._cooling, (state.available_at, next(self._seq), state.epoch, state.proxy))
+
+    def _release_cooled(self, now: float):
+        while self._cooling and self._cooling[0][0] <= now:
+            _, _, epoch, proxy = heapq.heappop(self._cooling)
+            state = self.states.get(proxy)
+            if state is not None and state.epoch == epoch:
+                self._push_ready(state)
+
+    def _has_headroom(self, proxy: str) -> bool:
+        limiter = self.limiters.get(proxy)
+        return limiter is None or limiter.in_flight < limiter.limit
+
+    def _select(self, now: float) -> str | None:
+        self._release_cooled(now)
+        # Прокси, чей адаптивный лимит уже выбран, пропускается, не теряя своей очереди: иначе запросы
+        # вставали бы за ним в slot(), пока остальные простаивают. Его доля вернется, как только лимит освободится.
+        ready = self._ready
+        busy = []
+        state = None
+        while ready and len(busy) < BUSY_SKIP_LIMIT:
+            pass_value, _, epoch, proxy = ready[0]
+            state = self.states.get(proxy)
+            if state is None or state.epoch != epoch:
+                heapq.heappop(ready)
+                state = None
+                continue
+            if self._has_headroom(proxy):
+                break
+            busy.append(heapq.heappop(ready))
+            state = None
+        if state is None:
+            if not busy:
+                return None
+            # Заняты все: берется тот, чья очередь подошла раньше (вернувшись в кучу, он снова на вершине),
+            # и запрос ждет его слота.
+            for entry in busy:
+                heapq.heappush(ready, entry)
+            busy = []
+            pass_value, _, _, proxy = ready[0]
+            state = self.states[proxy]
+        self._global_pass = pass_value
+        state.pass_value = pass_value + 1.0 / state.weight
+        # Выбранный прокси на вершине кучи, поэтому его сдвиг - одна операция heapreplace вместо pop и push.
+        heapq.heapreplace(ready, (state.pass_value, next(self._seq), state.epoch, proxy))
+        for entry in busy:
+            heapq.heappush(ready, entry)
+        return proxy
+
     async def get_proxy(self) -> str | None:
-        async with self._lock:
-            if not self.proxies:
+        while self.states:
+            now = time.monotonic()
+            proxy = self._select(now)
+            if proxy is not None:
+                return proxy
+            if not self._cooling:
                 return None
-            start_index = self.current_index
-            while True:
-                proxy = self.proxies[self.current_index]
-                cooldown_end_time = self.cooldowns.get(proxy, 0)
-                if time.time() >= cooldown_end_time:
-                    self.current_index = (self.current_index + 1) % len(self.proxies)
-                    return proxy
-                self.current_index = (self.current_index + 1) % len(self.proxies)
-                if self.current_index == start_index:
-                    logging.warning("Все прокси на кулдауне. Ожидание...")
-                    await asyncio.sleep(self.cooldown_seconds)
+            wake_at = self._cooling[0][0]
+            if wake_at > self._wait_logged_until:
+                self._wait_logged_until = wake_at
+                logging.warning(f"Все прокси на кулдауне. Ожидание {wake_at - now:.1f} сек...")
+            await asyncio.sleep(max(wake_at - now, 0))
+        return None
+
+    @contextlib.asynccontextmanager
+    async def slot(self, proxy: str | None):
+        if not proxy:
+            yield
+            return
+        limiter = self.limiters.get(proxy)
+        if limiter is None:
+            limiter = self.limiters[proxy] = AdaptiveLimiter(
+                initial=self.initial_concurrency,
+                min_limit=1,
+                max_limit=self.proxy_concurrency,
+                latency_target=self.latency_target,
+            )
+        async with limiter.slot():
+            yield
+
+    def report_success(self, proxy: str, latency: float):
+        state = self.states.get(proxy)
+        if state is None:
+            return
+        alpha = self.ewma_alpha
+        state.failure_streak = 0
+        state.success_rate += alpha * (1.0 - state.success_rate)
+        state.latency += alpha * (latency - state.latency)
 
     def report_failure(self, proxy: str):
-        self.cooldowns[proxy] = time.time() + self.cooldown_seconds
-        proxy_display = proxy.split('@')[-1] if '@' in proxy else proxy
-        logging.warning(f"Прокси {proxy_display} отправлен на отдых на {self.cooldown_seconds} сек.")
+        state = self.states.get(proxy)
+        if state is None:
+            return
+        now = time.monotonic()
+        if state.available_at > now:
+            return
+        state.failure_streak += 1
+        state.success_rate -= self.ewma_alpha * state.success_rate
+        cooldown = min(self.cooldown_seconds * 2 ** (state.failure_streak - 1), self.max_cooldown_seconds)
+        state.available_at = now + cooldown
+        self._push_cooling(state)
+        logging.warning(f"Прокси {display_proxy(proxy)} отправлен на отдых на {cooldown} сек.")
+
+    def apply_probe(self, proxy: str, latency: float | None, cooldown: float = 0.0):
+        state = self.states.get(proxy)
+        if state is None:
+            return
+        now = time.monotonic()
+        if latency is not None:
+            self.report_success(proxy, latency)
+            if state.available_at > now:
+                state.available_at = 0.0
+                self._push_ready(state)
+            return
+        state.success_rate -= self.ewma_alpha * state.success_rate
+        # Без cooldown неудачная проверка только снижает вес (так бывает, когда лежит сам t.me).
+        if cooldown > 0 and state.available_at < now + cooldown:
+            state.available_at = now + cooldown
+            self._push_cooling(state)
+
 
-proxy_manager = ProxyManager(cooldown_seconds=30)
\ No newline at end of file
+proxy_manager = ProxyManager(
+    cooldown_seconds=config.PROXY_COOLDOWN,
+    max_cooldown_seconds=config.PROXY_MAX_COOLDOWN,
+    proxy_concurrency=config.PROXY_CONCURRENCY,
+    initial_concurrency=config.PROXY_INITIAL_CONCURRENCY,
+    latency_target=config.FETCH_LATENCY_TARGET,
+)
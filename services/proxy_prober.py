@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from typing import Callable
+
+import config
+import database as db
+from services.http_client import http_client
+from services.proxy_manager import proxy_manager
+
+PROBE_OUTAGE_SHARE = 0.5
+PROBE_OUTAGE_MIN_PROXIES = 3
+
+
+async def probe_proxy(proxy_str: str, timeout: float) -> float | None:
+    # Проверяется доступность самого t.me: сторонний сервис мог бы лежать или блокировать прокси,
+    # хотя t.me через них работает. Любой ответ, кроме 429 и 5xx, значит, что прокси пропускает трафик.
+    started_at = time.monotonic()
+    try:
+        session = http_client.session(proxy_str)
+        async with session.get(config.GIFT_BASE_URL, timeout=timeout, allow_redirects=False) as response:
+            await response.read()
+            if response.status != 429 and response.status < 500:
+                return time.monotonic() - started_at
+    except Exception:
+        pass
+    return None
+
+
+class ProxyProber:
+    def __init__(self, interval: float, concurrency: int, timeout: float):
+        self.interval = interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # Последняя проверка каждого прокси: время, задержка (None - не прошел) и отдых после нее.
+        # Воркеры получают ее от бота.
+        self.checks: dict[str, tuple[float, float | None, float]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def probe_all(
+            self,
+            proxies: list[str] | None = None,
+            on_result: Callable[[str, float | None], None] | None = None
+    ) -> list[tuple[str, float | None]]:
+        if proxies is None:
+            proxies = await db.get_all_proxies()
+        # Фиксированный пул воркеров вместо задачи на каждый прокси: на тысячах прокси не плодит тысячи корутин.
+        pending = iter(proxies)
+        results = []
+
+        async def worker():
+            for proxy_str in pending:
+                latency = await probe_proxy(proxy_str, self.timeout)
+                results.append((proxy_str, latency))
+                if on_result is not None:
+                    on_result(proxy_str, latency)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(proxies)))))
+        await db.save_proxy_checks(results)
+        # Не прошедший проверку прокси отдыхает до следующего круга, чтобы поиски его не выбирали.
+        # Если же не прошло большинство, скорее всего лежит сам t.me, и неудача только снижает вес.
+        failed = sum(1 for _, latency in results if latency is None)
+        outage = len(results) >= PROBE_OUTAGE_MIN_PROXIES and failed > len(results) * PROBE_OUTAGE_SHARE
+        if outage:
+            logging.warning(f"Проверку не прошли {failed} из {len(results)} прокси, похоже на сбой t.me.")
+        cooldown = 0.0 if outage else self.interval
+        checked_at = time.time()
+        for proxy_str, latency in results:
+            proxy_manager.apply_probe(proxy_str, latency, cooldown)
+            self.checks[proxy_str] = (checked_at, latency, cooldown)
+        return results
+
+    async def _run(self):
+        while True:
+            try:
+                results = await self.probe_all()
+                alive = sum(1 for _, latency in results if latency is not None)
+                logging.info(f"Фоновая проверка прокси: рабочих {alive} из {len(results)}.")
+            except Exception as e:
+                logging.error(f"Ошибка фоновой проверки прокси: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+proxy_prober = ProxyProber(
+    interval=config.PROXY_PROBE_INTERVAL,
+    concurrency=config.PROXY_PROBE_CONCURRENCY,
+    timeout=config.PROXY_PROBE_TIMEOUT,
+)
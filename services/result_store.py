@@ -0,0 +1,76 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import config
+import database as db
+
+PAGE_SIZE = 5
+
+
+def format_record(url: str, owner: str) -> str:
+    return f"🔗 <a href='{url}'>NFT Gift</a>\n👤 {owner}"
+
+
+@dataclass
+class SearchResult:
+    gift_name: str
+    start_id: int
+    end_id: int
+    records: list[tuple[str, str]]
+
+    @property
+    def total_pages(self) -> int:
+        return (len(self.records) + PAGE_SIZE - 1) // PAGE_SIZE
+
+    def render_page(self, page: int) -> str:
+        header = (
+            f"✅ <b>Поиск завершен!</b>\n"
+            f"🎁 Подарок: <b>{self.gift_name}</b>\n"
+            f"🔢 Диапазон: {self.start_id}-{self.end_id}\n"
+            f"👥 Найдено с учетом фильтров: {len(self.records)}\n\n"
+        )
+        chunk = self.records[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+        page_lines = [format_record(url, owner) for url, owner in chunk]
+        return header + "<b>Список:</b>\n" + "\n\n".join(page_lines)
+
+
+class ResultStore:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[SearchResult, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, chat_id: int, result: SearchResult):
+        result.records = list(dict.fromkeys(result.records))
+        self._entries[chat_id] = (result, time.time() + self.ttl)
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, chat_id: int) -> SearchResult | None:
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            result, expires_at = entry
+            if expires_at >= time.time():
+                self._entries.move_to_end(chat_id)
+                return result
+            del self._entries[chat_id]
+
+        # Вытесненные из памяти результаты уже лежат в search_matches, поднимаем их оттуда.
+        row = await db.get_latest_search_result(chat_id, time.time() - self.ttl)
+        if row is None:
+            return None
+        job_id, gift_name, start_id, end_id = row
+        records = await db.get_search_matches(job_id)
+        if not records:
+            return None
+        result = SearchResult(gift_name=gift_name, start_id=start_id, end_id=end_id, records=records)
+        self.put(chat_id, result)
+        return result
+
+
+result_store = ResultStore(max_entries=config.RESULT_STORE_SIZE, ttl=config.RESULT_STORE_TTL)
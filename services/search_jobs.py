@@ -0,0 +1,427 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import config
+import database as db
+from services import metrics
+from services.gift_catalog import gift_slug
+from services.gift_fetcher import fetch_gift_shard, parse_gift_data
+from services.gift_filter import GiftFilter
+from services.gift_parser import GiftRecord
+
+_job_ids = itertools.count(1)
+
+
+class SearchRejected(Exception):
+    pass
+
+
+@dataclass
+class SearchStats:
+    total: int
+    processed: int = 0
+    resumed_from: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def rate(self) -> float:
+        return (self.processed - self.resumed_from) / self.elapsed
+
+
+class SearchJob:
+    def __init__(
+            self,
+            user_id: int,
+            chat_id: int,
+            gift_name: str,
+            start_id: int,
+            end_id: int,
+            gift_filter: GiftFilter,
+            filters: dict | None = None,
+            job_id: int | None = None,
+            processed: bytes | None = None,
+            found: list[tuple[str, str]] | None = None,
+            max_matches: int | None = None
+    ):
+        total = end_id - start_id + 1
+        self.id = job_id if job_id is not None else next(_job_ids)
+        self.persistent = job_id is not None
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.gift_name = gift_name
+        self.slug = gift_slug(gift_name)
+        self.start_id = start_id
+        self.end_id = end_id
+        self.gift_filter = gift_filter
+        self.filters = filters or {}
+        self.max_matches = max_matches
+        self.status_message_id: int | None = None
+        self.status = "queued"
+        self.stop_reason: str | None = None
+        # Бит на каждый номер диапазона: по нему поиск продолжается после перезапуска без повторных запросов.
+        self.processed = bytearray(processed) if processed else bytearray((total + 7) // 8)
+        already_processed = sum(byte.bit_count() for byte in self.processed)
+        self.stats = SearchStats(total=total, processed=already_processed, resumed_from=already_processed)
+        self.found: list[tuple[str, str]] = list(found or [])
+        self.unsaved_found: list[tuple[str, str]] = []
+        self.new_found: list[tuple[str, str]] = []
+        self.dirty = False
+        self.in_flight = 0
+        self.tasks: set[asyncio.Task] = set()
+        self.done = asyncio.Event()
+        self.on_progress: Callable[["SearchJob"], Awaitable[None]] | None = None
+        self.on_finish: Callable[["SearchJob"], Awaitable[None]] | None = None
+        self._numbers = (n for n in range(start_id, end_id + 1) if not self.is_processed(n))
+        self._next_number = next(self._numbers, None)
+        self.last_progress_at = 0.0
+        self.progress_pending = False
+        self._progress_task: asyncio.Task | None = None
+
+    @property
+    def exhausted(self) -> bool:
+        return self._next_number is None
+
+    @property
+    def limit_reached(self) -> bool:
+        return self.max_matches is not None and len(self.found) >= self.max_matches
+
+    def take_number(self) -> int | None:
+        number = self._next_number
+        if number is not None:
+            self._next_number = next(self._numbers, None)
+        return number
+
+    def take_numbers(self, limit: int) -> list[int]:
+        numbers = []
+        while len(numbers) < limit and self._next_number is not None:
+            numbers.append(self.take_number())
+        return numbers
+
+    def is_processed(self, number: int) -> bool:
+        index = number - self.start_id
+        return bool(self.processed[index >> 3] & (1 << (index & 7)))
+
+    def mark_processed(self, number: int):
+        index = number - self.start_id
+        self.processed[index >> 3] |= 1 << (index & 7)
+        self.stats.processed += 1
+        self.dirty = True
+
+    def add_match(self, url: str, owner: str):
+        self.found.append((url, owner))
+        self.unsaved_found.append((url, owner))
+        self.new_found.append((url, owner))
+
+    def take_new_found(self) -> list[tuple[str, str]]:
+        new_found, self.new_found = self.new_found, []
+        # Новые совпадения - хвост found. Те, что легли сверх max_matches, не попадут в итоговый список,
+        # поэтому и по ходу поиска о них не сообщается.
+        if self.max_matches is not None:
+            first = len(self.found) - len(new_found)
+            new_found = new_found[:max(self.max_matches - first, 0)]
+        return new_found
+
+
+class SearchScheduler:
+    def __init__(
+            self,
+            fetch: Callable[[str, int], Awaitable[GiftRecord | None]],
+            concurrency: int,
+            max_running_jobs: int,
+            max_queued_jobs: int,
+            user_concurrency: int,
+            user_max_jobs: int,
+            checkpoint_interval: float,
+            progress_interval: float,
+            fetch_batch: Callable[[str, list[int]], Awaitable[list[GiftRecord | None]]] | None = None,
+            batch_size: int = 1
+    ):
+        self.fetch = fetch
+        # С fetch_batch единица работы - пачка из batch_size номеров (шард для воркеров), а не один номер.
+        self.fetch_batch = fetch_batch
+        self.batch_size = batch_size if fetch_batch is not None else 1
+        self.concurrency = concurrency
+        self.max_running_jobs = max_running_jobs
+        self.max_queued_jobs = max_queued_jobs
+        self.user_concurrency = user_concurrency
+        self.user_max_jobs = user_max_jobs
+        self.checkpoint_interval = checkpoint_interval
+        self.progress_interval = progress_interval
+        self.queue: deque[SearchJob] = deque()
+        self.running: deque[SearchJob] = deque()
+        self._user_jobs: dict[int, int] = {}
+        self._user_in_flight: dict[int, int] = {}
+        self._slots: asyncio.Semaphore | None = None
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task | None = None
+        self._checkpointer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self):
+        if self._dispatcher is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._dispatcher = asyncio.create_task(self._dispatch())
+            self._checkpointer = asyncio.create_task(self._checkpoint_periodically())
+
+    async def stop(self):
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        self._checkpointer.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._dispatcher, self._checkpointer, *self._tasks, return_exceptions=True)
+        self._dispatcher = None
+        self._checkpointer = None
+        await self.checkpoint()
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._user_in_flight.values())
+
+    def position(self, job: SearchJob) -> int:
+        try:
+            return self.queue.index(job) + 1
+        except ValueError:
+            return 0
+
+    def ensure_can_submit(self, user_id: int):
+        if self._user_jobs.get(user_id, 0) >= self.user_max_jobs:
+            raise SearchRejected("У вас уже есть активный поиск. Дождитесь его завершения.")
+        if len(self.queue) >= self.max_queued_jobs:
+            raise SearchRejected("Очередь поиска переполнена. Попробуйте чуть позже.")
+
+    def submit(self, job: SearchJob, force: bool = False) -> int:
+        if not force:
+            self.ensure_can_submit(job.user_id)
+        self._user_jobs[job.user_id] = self._user_jobs.get(job.user_id, 0) + 1
+        self.queue.append(job)
+        self._admit()
+        return self.position(job)
+
+    def cancel(self, job: SearchJob, reason: str = "cancelled"):
+        if job.status == "done":
+            return
+        job.stop_reason = reason
+        job._next_number = None
+        # Отменяются и уже начатые запросы: номера, которые не успели проверить, просто не отмечаются.
+        current = asyncio.current_task()
+        for task in list(job.tasks):
+            if task is not current:
+                task.cancel()
+        self._finish(job)
+
+    def cancel_user(self, user_id: int) -> int:
+        jobs = [job for job in (*self.running, *self.queue) if job.user_id == user_id]
+        for job in jobs:
+            self.cancel(job)
+        return len(jobs)
+
+    def _admit(self):
+        admitted = False
+        while self.queue and len(self.running) < self.max_running_jobs:
+            job = self.queue.popleft()
+            job.status = "running"
+            job.stats.started_at = time.monotonic()
+            self.running.append(job)
+            admitted = True
+            if job.exhausted:
+                self._finish(job)
+            else:
+                self._notify_progress(job)
+        if admitted:
+            for job in self.queue:
+                self._notify_progress(job)
+            self._wakeup.set()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _notify_progress(self, job: SearchJob):
+        # Уведомления склеиваются: пока ждем интервал или отправляем предыдущее, только отмечаем,
+        # что состояние изменилось, и потом отправляется одно обновление с последними данными.
+        if job.on_progress is None:
+            return
+        job.progress_pending = True
+        if job._progress_task is None or job._progress_task.done():
+            job._progress_task = self._spawn(self._report_progress(job))
+
+    async def _report_progress(self, job: SearchJob):
+        while job.progress_pending and job.status != "done":
+            delay = job.last_progress_at + self.progress_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                if job.status == "done":
+                    return
+            job.progress_pending = False
+            job.last_progress_at = time.monotonic()
+            await self._safe_call(job.on_progress, job)
+
+    async def _safe_call(self, callback, job: SearchJob):
+        try:
+            await callback(job)
+        except Exception as e:
+            logging.error(f"Ошибка обработчика поиска #{job.id}: {e}")
+
+    def _take_work(self) -> tuple[SearchJob, list[int]] | None:
+        for _ in range(len(self.running)):
+            job = self.running[0]
+            self.running.rotate(-1)
+            if self._user_in_flight.get(job.user_id, 0) >= self.user_concurrency:
+                continue
+            numbers = job.take_numbers(self.batch_size)
+            if not numbers:
+                continue
+            job.in_flight += 1
+            self._user_in_flight[job.user_id] = self._user_in_flight.get(job.user_id, 0) + 1
+            return job, numbers
+        return None
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            work = self._take_work()
+            while work is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                work = self._take_work()
+            job = work[0]
+            task = self._spawn(self._process(*work))
+            job.tasks.add(task)
+            task.add_done_callback(job.tasks.discard)
+
+    @staticmethod
+    def _matches(job: SearchJob, record: GiftRecord) -> bool:
+        if not metrics.enabled:
+            return job.gift_filter.matches(record)
+        started = time.perf_counter()
+        matched = job.gift_filter.matches(record)
+        metrics.filter_seconds.observe(time.perf_counter() - started)
+        metrics.pages_total.inc("match" if matched else "miss")
+        return matched
+
+    async def _process(self, job: SearchJob, numbers: list[int]):
+        try:
+            if self.fetch_batch is not None:
+                records = await self.fetch_batch(job.slug, numbers)
+            else:
+                records = [await self.fetch(job.slug, numbers[0])]
+            for number, record in zip(numbers, records):
+                if record and self._matches(job, record):
+                    job.add_match(record.url, record.owner)
+                job.mark_processed(number)
+        except Exception as e:
+            logging.error(f"Ошибка при обработке {job.slug}-{numbers[0]} ({len(numbers)} шт.): {e}")
+            if metrics.enabled:
+                metrics.pages_total.inc("error", amount=len(numbers))
+            for number in numbers:
+                if not job.is_processed(number):
+                    job.mark_processed(number)
+        finally:
+            job.in_flight -= 1
+            self._user_in_flight[job.user_id] -= 1
+            if not self._user_in_flight[job.user_id]:
+                del self._user_in_flight[job.user_id]
+            self._slots.release()
+            self._wakeup.set()
+
+        if job.limit_reached:
+            self.cancel(job, "limit")
+        elif job.exhausted and job.in_flight == 0:
+            self._finish(job)
+        else:
+            self._notify_progress(job)
+
+    def _finish(self, job: SearchJob):
+        if job.status == "done":
+            return
+        job.status = "done"
+        job.stats.finished_at = time.monotonic()
+        if job in self.running:
+            self.running.remove(job)
+        else:
+            self.queue.remove(job)
+        self._user_jobs[job.user_id] -= 1
+        if not self._user_jobs[job.user_id]:
+            del self._user_jobs[job.user_id]
+        logging.info(
+            f"Поиск #{job.id} ({job.gift_name}) завершен: {job.stats.processed} страниц за "
+            f"{job.stats.elapsed:.1f} сек. ({job.stats.rate:.1f} стр/сек), найдено {len(job.found)}"
+        )
+        job.done.set()
+        if job._progress_task is not None:
+            job._progress_task.cancel()
+        self._spawn(self._complete(job))
+        self._admit()
+
+    async def _complete(self, job: SearchJob):
+        if job.persistent:
+            await self.checkpoint([job], finished=True)
+        if job.on_finish is not None:
+            await self._safe_call(job.on_finish, job)
+
+    async def checkpoint(self, jobs: list[SearchJob] | None = None, finished: bool = False):
+        jobs = [job for job in (self.running if jobs is None else jobs) if job.persistent and (job.dirty or finished)]
+        if not jobs:
+            return
+        job_rows = []
+        match_rows = []
+        pending = []
+        for job in jobs:
+            job.dirty = False
+            job_rows.append((bytes(job.processed), job.stats.processed, job.id))
+            match_rows.extend((job.id, url, owner) for url, owner in job.unsaved_found)
+            pending.append((job, job.unsaved_found))
+            job.unsaved_found = []
+        saved = False
+        try:
+            saved = await db.save_search_checkpoints(job_rows, match_rows, [job.id for job in jobs] if finished else [])
+        finally:
+            if not saved:
+                # Запись не удалась: совпадения и прогресс возвращаются в задачи и уйдут со следующим чекпоинтом.
+                for job, unsaved_found in pending:
+                    job.dirty = True
+                    job.unsaved_found = unsaved_found + job.unsaved_found
+
+    async def _checkpoint_periodically(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await self.checkpoint()
+            except Exception as e:
+                logging.error(f"Ошибка при сохранении прогресса поисков: {e}")
+
+
+WORKERS_ENABLED = config.SEARCH_WORKERS > 0 or config.SEARCH_REMOTE_WORKERS
+# С воркерами единица работы - шард, поэтому доля пользователя пересчитывается в шарды в той же пропорции.
+USER_SHARDS_IN_FLIGHT = max(1, config.SHARDS_IN_FLIGHT * config.USER_SEARCH_CONCURRENCY // config.SEARCH_CONCURRENCY)
+
+search_scheduler = SearchScheduler(
+    fetch=parse_gift_data,
+    concurrency=config.SHARDS_IN_FLIGHT if WORKERS_ENABLED else config.SEARCH_CONCURRENCY,
+    max_running_jobs=config.SEARCH_MAX_RUNNING_JOBS,
+    max_queued_jobs=config.SEARCH_MAX_QUEUED_JOBS,
+    user_concurrency=USER_SHARDS_IN_FLIGHT if WORKERS_ENABLED else config.USER_SEARCH_CONCURRENCY,
+    user_max_jobs=config.USER_MAX_SEARCHES,
+    checkpoint_interval=config.SEARCH_CHECKPOINT_INTERVAL,
+    progress_interval=config.SEARCH_PROGRESS_INTERVAL,
+    fetch_batch=fetch_gift_shard if WORKERS_ENABLED else None,
+    batch_size=config.SHARD_SIZE,
+)
+
+metrics.register_gauge("gifthunter_active_searches", "Выполняющиеся поиски", lambda: len(search_scheduler.running))
+metrics.register_gauge("gifthunter_queued_searches", "Поиски в очереди", lambda: len(search_scheduler.queue))
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import logging
+import time
+
+import config
+import database as db
+
+ShardResult = list[list]
+
+
+class ShardQueue:
+    def __init__(self, lease_timeout: float):
+        self.lease_timeout = lease_timeout
+        self.workers: dict[str, float] = {}
+        self.completed = 0
+        self._waiting: dict[int, asyncio.Future] = {}
+        self._available = asyncio.Event()
+
+    async def reset(self):
+        # Шарды прошлого запуска никому не нужны: незавершенные поиски продолжатся по своим чекпоинтам.
+        await db.clear_scan_shards()
+
+    async def run(self, slug: str, numbers: list[int]) -> ShardResult:
+        shard_id = await db.create_scan_shard(slug, json.dumps(numbers))
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[shard_id] = future
+        self._available.set()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            await db.delete_scan_shard(shard_id)
+            raise
+        finally:
+            self._waiting.pop(shard_id, None)
+
+    def touch(self, worker: str):
+        self.workers[worker] = time.time()
+
+    async def lease(self, worker: str, wait: float) -> tuple[int, str, list[int]] | None:
+        self.touch(worker)
+        deadline = time.monotonic() + wait
+        while True:
+            self._available.clear()
+            row = await db.lease_scan_shard(worker, self.lease_timeout)
+            if row is not None:
+                shard_id, slug, numbers = row
+                return shard_id, slug, json.loads(numbers)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._available.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    async def complete(self, worker: str, shard_id: int, results: ShardResult) -> bool:
+        self.touch(worker)
+        # Шард мог быть отменен или уже сдан другим воркером после истечения аренды.
+        if not await db.delete_scan_shard(shard_id):
+            return False
+        self.completed += 1
+        future = self._waiting.get(shard_id)
+        if future is not None and not future.done():
+            future.set_result(results)
+        else:
+            logging.debug(f"Результат шарда #{shard_id} от {worker} больше никому не нужен.")
+        return True
+
+    def active_workers(self, within: float) -> list[str]:
+        now = time.time()
+        return [worker for worker, seen_at in self.workers.items() if now - seen_at <= within]
+
+
+shard_queue = ShardQueue(lease_timeout=config.SHARD_LEASE_TIMEOUT)
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._waiters: dict[Hashable, int] = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def _forget(self, key: Hashable):
+        self._in_flight.pop(key, None)
+        self._waiters.pop(key, None)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is None:
+            self.executed += 1
+            # Запрос живет в отдельной задаче: отмена первого вызвавшего не должна обрывать его для остальных.
+            future = asyncio.ensure_future(fn())
+            self._in_flight[key] = future
+            self._waiters[key] = 0
+            future.add_done_callback(lambda _: self._forget(key))
+        else:
+            self.deduplicated += 1
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Если запрос больше никому не нужен (например, поиск отменен), он отменяется целиком.
+            if self._in_flight.get(key) is future:
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    future.cancel()
+            raise
+
+
+_ABANDONED = object()
+
+
+class BatchFlight:
+    # То же для пачек: ключи, которые уже запрошены чужой пачкой, ждутся оттуда, а запрашиваются только остальные.
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, keys: list[Hashable],
+                 fn: Callable[[list[Hashable]], Awaitable[dict[Hashable, T]]]) -> dict[Hashable, T | None]:
+        results: dict[Hashable, T | None] = {}
+        while keys:
+            joined = {key: self._in_flight[key] for key in keys if key in self._in_flight}
+            own = [key for key in keys if key not in joined]
+            self.deduplicated += len(joined)
+            if own:
+                results.update(await self._run(own, fn))
+            # Если чужую пачку отменили или она упала, ее ключи запрашиваются заново уже своей пачкой.
+            keys = []
+            for key, future in joined.items():
+                value = await asyncio.shield(future)
+                if value is _ABANDONED:
+                    keys.append(key)
+                else:
+                    results[key] = value
+        return results
+
+    async def _run(self, keys: list[Hashable], fn) -> dict[Hashable, T | None]:
+        self.executed += len(keys)
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in keys}
+        self._in_flight.update(futures)
+        found = None
+        try:
+            found = await fn(keys)
+            return {key: found.get(key) for key in keys}
+        finally:
+            for key, future in futures.items():
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+                if not future.done():
+                    future.set_result(_ABANDONED if found is None else found.get(key))
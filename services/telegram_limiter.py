@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage,
+    DeleteMessage,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    ForwardMessage,
+    GetUpdates,
+    SendDocument,
+    SendMessage,
+    SendPhoto,
+)
+from aiogram.methods.base import Response, TelegramMethod, TelegramType
+
+import config
+from services import metrics
+
+RATE_LIMITED_METHODS = (
+    SendMessage,
+    EditMessageText,
+    EditMessageReplyMarkup,
+    DeleteMessage,
+    SendDocument,
+    SendPhoto,
+    CopyMessage,
+    ForwardMessage,
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                    self.updated_at = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    def __init__(self, global_rate: float, private_chat_rate: float, group_chat_rate: float, max_retries: int,
+                 max_tracked_chats: int = 10000):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.max_retries = max_retries
+        self.max_tracked_chats = max_tracked_chats
+        self._chats: OrderedDict[int | str, TokenBucket] = OrderedDict()
+        self.requests = 0
+        self.delayed = 0
+        self.retries = 0
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            rate = self.private_chat_rate if is_private else self.group_chat_rate
+            # Небольшой запас на всплеск: ответ на команду и сразу правка статуса не должны ждать друг друга.
+            bucket = self._chats[chat_id] = TokenBucket(rate, capacity=3 if is_private else 1)
+            while len(self._chats) > self.max_tracked_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    @staticmethod
+    async def _request(
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        # Долгий опрос getUpdates висит до таймаута и исказил бы задержки остальных вызовов.
+        if not metrics.enabled or isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            metrics.telegram_api_seconds.observe(time.perf_counter() - started, type(method).__name__)
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        if not isinstance(method, RATE_LIMITED_METHODS):
+            return await self._request(make_request, bot, method)
+
+        self.requests += 1
+        bucket = self._chat_bucket(method.chat_id)
+        for attempt in range(self.max_retries + 1):
+            waited = await bucket.acquire() + await self.global_bucket.acquire()
+            if waited:
+                self.delayed += 1
+            if metrics.enabled:
+                metrics.telegram_wait_seconds.observe(waited)
+            try:
+                return await self._request(make_request, bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                logging.warning(
+                    f"Telegram ограничил отправку в чат {method.chat_id}: повтор через {e.retry_after} сек."
+                )
+                bucket.block_for(e.retry_after)
+
+
+telegram_rate_limiter = TelegramRateLimiter(
+    global_rate=config.TELEGRAM_GLOBAL_RATE,
+    private_chat_rate=config.TELEGRAM_PRIVATE_CHAT_RATE,
+    group_chat_rate=config.TELEGRAM_GROUP_CHAT_RATE,
+    max_retries=config.TELEGRAM_MAX_RETRIES,
+)
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+import secrets
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+import config
+from services import metrics
+
+
+def build_webhook_app(bot: Bot, dp: Dispatcher, secret: str) -> web.Application:
+    app = web.Application()
+    # Ответ Telegram уходит сразу, апдейт обрабатывается в фоне: медленный обработчик не задерживает доставку.
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    # Сервер вебхука смотрит наружу, поэтому здесь только /health, а /metrics остается на локальном MetricsServer.
+    metrics.add_routes(app, with_metrics=False)
+    return app
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    # Без секрета любой, кто узнал адрес, мог бы слать боту поддельные апдейты, поэтому он генерируется, если не задан.
+    secret = config.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    runner = web.AppRunner(build_webhook_app(bot, dp, secret), access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT).start()
+        await bot.set_webhook(
+            url=config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=True,
+        )
+        logging.info(f"Вебхук слушает {config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
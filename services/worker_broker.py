@@ -0,0 +1,177 @@
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+import sys
+from dataclasses import dataclass
+
+from aiohttp import web
+
+import config
+import database as db
+from services.gift_fetcher import fetch_limiter
+from services.proxy_manager import proxy_manager
+from services.proxy_prober import proxy_prober
+from services.shard_queue import shard_queue
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "worker.py")
+TOKEN_ENV = "GIFTHUNTER_WORKER_TOKEN"
+LEASE_WAIT = 20.0
+RESTART_DELAY = 5.0
+WORKER_SEEN_WINDOW = 60.0
+
+
+@dataclass
+class LimiterTotals:
+    limit: int = 0
+    in_flight: int = 0
+    increases: int = 0
+    decreases: int = 0
+
+
+def limiter_report() -> dict:
+    return {
+        "fetch": [fetch_limiter.limit, fetch_limiter.in_flight, fetch_limiter.increases, fetch_limiter.decreases],
+        "proxies": {proxy: [limiter.limit, limiter.in_flight] for proxy, limiter in proxy_manager.limiters.items()},
+    }
+
+
+class WorkerBroker:
+    def __init__(self, host: str, port: int, token: str, local_workers: int, remote_workers: bool):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.local_workers = local_workers
+        self.remote_workers = remote_workers
+        self._runner: web.AppRunner | None = None
+        self._supervisors: list[asyncio.Task] = []
+        self._processes: dict[int, asyncio.subprocess.Process] = {}
+        self.reports: dict[str, dict] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.local_workers > 0 or self.remote_workers
+
+    @property
+    def url(self) -> str:
+        host = "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+        return f"http://{host}:{self.port}"
+
+    @web.middleware
+    async def _auth(self, request: web.Request, handler):
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied, self.token):
+            raise web.HTTPUnauthorized()
+        return await handler(request)
+
+    async def _lease(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        shard = await shard_queue.lease(body["worker"], LEASE_WAIT)
+        if shard is None:
+            return web.json_response({"shard": None})
+        shard_id, slug, numbers = shard
+        return web.json_response({"shard": {"id": shard_id, "slug": slug, "numbers": numbers}})
+
+    async def _complete(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        accepted = await shard_queue.complete(body["worker"], body["id"], body["results"])
+        if "limits" in body:
+            self.reports[body["worker"]] = body["limits"]
+        return web.json_response({"accepted": accepted})
+
+    async def _proxies(self, request: web.Request) -> web.Response:
+        worker = request.query.get("worker")
+        if worker:
+            shard_queue.touch(worker)
+        return web.json_response({
+            "proxies": proxy_manager.proxies,
+            "stats": await db.get_proxy_stats(),
+            "checks": proxy_prober.checks,
+            "limits": self.apply_limits(),
+        })
+
+    def apply_limits(self) -> dict:
+        # Прокси и t.me общие, поэтому лимиты из config делятся поровну между ботом и воркерами на связи.
+        # Иначе каждый новый воркер добавлял бы еще PROXY_CONCURRENCY запросов на тот же прокси.
+        sharers = len(shard_queue.active_workers(within=WORKER_SEEN_WINDOW)) + 1
+        limits = {
+            "proxy": max(config.PROXY_CONCURRENCY // sharers, 1),
+            "search": max(config.SEARCH_CONCURRENCY // sharers, 1),
+        }
+        proxy_manager.set_proxy_concurrency(limits["proxy"])
+        fetch_limiter.set_max_limit(limits["search"])
+        return limits
+
+    def limiter_totals(self) -> tuple[LimiterTotals, dict[str, LimiterTotals]]:
+        # В режиме воркеров бот сам почти не ходит на t.me, поэтому /stats складывает лимиты бота и воркеров на связи.
+        reports = [limiter_report()]
+        reports += [self.reports[worker] for worker in shard_queue.active_workers(within=WORKER_SEEN_WINDOW)
+                    if worker in self.reports]
+        fetch = LimiterTotals()
+        proxies: dict[str, LimiterTotals] = {}
+        for report in reports:
+            limit, in_flight, increases, decreases = report["fetch"]
+            fetch.limit += limit
+            fetch.in_flight += in_flight
+            fetch.increases += increases
+            fetch.decreases += decreases
+            for proxy, (limit, in_flight) in report["proxies"].items():
+                totals = proxies.setdefault(proxy, LimiterTotals())
+                totals.limit += limit
+                totals.in_flight += in_flight
+        return fetch, proxies
+
+    async def start(self):
+        if not self.enabled:
+            return
+        if not self.token:
+            if self.remote_workers:
+                raise RuntimeError("Для удаленных воркеров задайте WORKER_TOKEN в config.py")
+            self.token = secrets.token_urlsafe(32)
+        await shard_queue.reset()
+
+        app = web.Application(middlewares=[self._auth])
+        app.router.add_post("/lease", self._lease)
+        app.router.add_post("/complete", self._complete)
+        app.router.add_get("/proxies", self._proxies)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Раздача шардов воркерам запущена на {self.host}:{self.port}.")
+
+        for index in range(self.local_workers):
+            self._supervisors.append(asyncio.create_task(self._supervise(index)))
+
+    async def _supervise(self, index: int):
+        env = {**os.environ, TOKEN_ENV: self.token}
+        while True:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, WORKER_SCRIPT, "--broker", self.url, "--id", f"local-{index}", env=env)
+            self._processes[index] = process
+            code = await process.wait()
+            logging.warning(f"Локальный воркер local-{index} завершился с кодом {code}, перезапуск...")
+            await asyncio.sleep(RESTART_DELAY)
+
+    async def stop(self):
+        for task in self._supervisors:
+            task.cancel()
+        await asyncio.gather(*self._supervisors, return_exceptions=True)
+        self._supervisors = []
+        for process in self._processes.values():
+            if process.returncode is None:
+                process.terminate()
+        await asyncio.gather(*(process.wait() for process in self._processes.values()), return_exceptions=True)
+        self._processes = {}
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+worker_broker = WorkerBroker(
+    host=config.WORKER_BROKER_HOST,
+    port=config.WORKER_BROKER_PORT,
+    token=config.WORKER_TOKEN,
+    local_workers=config.SEARCH_WORKERS,
+    remote_workers=config.SEARCH_REMOTE_WORKERS,
+)
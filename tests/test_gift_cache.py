@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+import database as db
+from services.gift_parser import GiftRecord
+
+RECORD = GiftRecord(url="https://t.me/nft/PlushPepe-1", owner="@owner", model="Ninja Mike",
+                    backdrop="Black", symbol="Illuminati")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "test.db"))
+    return db
+
+
+async def save_and_read(status: int, record: GiftRecord | None):
+    await db.init_db()
+    try:
+        await db.save_gift_page("PlushPepe", 1, status, record)
+        await db.flush_gift_pages()
+        return await db.get_gift_page("PlushPepe", 1, ttl=3600, negative_ttl=3600)
+    finally:
+        await db.close_db()
+
+
+def test_found_page_is_cached(database):
+    assert asyncio.run(save_and_read(200, RECORD)) == ("@owner", "Ninja Mike", "Black", "Illuminati")
+
+
+def test_missing_page_is_cached_as_negative(database):
+    assert asyncio.run(save_and_read(404, None)) == (None, None, None, None)
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503])
+def test_transient_errors_are_not_cached(database, status):
+    assert asyncio.run(save_and_read(status, None)) is None
+
+
+def test_failed_flush_keeps_rows_for_next_write(database, monkeypatch):
+    async def scenario():
+        await db.init_db()
+        try:
+            real_executemany = db.executemany
+
+            async def locked(sql, rows):
+                raise RuntimeError("database is locked")
+
+            monkeypatch.setattr(db, "executemany", locked)
+            await db.save_gift_page("PlushPepe", 1, 200, RECORD)
+            await db.flush_gift_pages()
+            monkeypatch.setattr(db, "executemany", real_executemany)
+            await db.flush_gift_pages()
+            return await db.get_gift_page("PlushPepe", 1, ttl=3600, negative_ttl=3600)
+        finally:
+            await db.close_db()
+
+    assert asyncio.run(scenario()) == ("@owner", "Ninja Mike", "Black", "Illuminati")
@@ -0,0 +1,12 @@
+import pytest
+
+from services.gift_catalog import GIFTS, find_gift
+
+
+def test_number_selects_gift():
+    assert find_gift(" 1 ") == (GIFTS[1], [])
+
+
+@pytest.mark.parametrize("query", ["²", "①", "¹²"])
+def test_non_decimal_digits_do_not_raise(query):
+    assert find_gift(query) == (None, [])
@@ -0,0 +1,73 @@
+import pytest
+
+from services.gift_filter import AttributeMatcher, GiftFilter
+from services.gift_parser import GiftRecord
+
+
+def gift(owner: str = "@owner", model: str = "Ninja Mike", backdrop: str = "Black",
+         symbol: str = "Illuminati") -> GiftRecord:
+    return GiftRecord(url="https://t.me/nft/PlushPepe-1", owner=owner, model=model, backdrop=backdrop, symbol=symbol)
+
+
+def test_exact_term_matches_whole_value_only():
+    matcher = AttributeMatcher(["Ninja Mike"])
+    assert matcher.matches("Ninja Mike")
+    assert not matcher.matches("Ninja")
+    assert not matcher.matches("Ninja Mike Gold")
+
+
+def test_star_makes_prefix_term():
+    matcher = AttributeMatcher(["Frog*"])
+    assert matcher.matches("Frogtor")
+    assert matcher.matches("Frog")
+    assert not matcher.matches("Cyber Frog")
+
+
+@pytest.mark.parametrize("value", ["ninja mike", "NINJA MIKE", "NiNjA MiKe"])
+def test_matching_ignores_case(value):
+    assert AttributeMatcher(["Ninja Mike"]).matches(value)
+    assert AttributeMatcher(["NINJA*"]).matches(value)
+
+
+def test_terms_are_trimmed():
+    matcher = AttributeMatcher(["  Black  ", " Gold * "])
+    assert matcher.exact == {"black"}
+    assert matcher.prefixes == ("gold",)
+
+
+@pytest.mark.parametrize("terms", [[], [""], ["   "], ["*"], ["**", " * "]])
+def test_empty_and_star_only_terms_are_ignored(terms):
+    matcher = AttributeMatcher(terms)
+    assert not matcher
+    assert GiftFilter(models=terms).matches(gift())
+
+
+def test_empty_filter_matches_everything():
+    assert GiftFilter().matches(gift())
+
+
+def test_all_attribute_groups_must_match():
+    gift_filter = GiftFilter(models=["Ninja*"], backgrounds=["Black"], patterns=["Illuminati"])
+    assert gift_filter.matches(gift())
+    assert not gift_filter.matches(gift(model="Frogtor"))
+    assert not gift_filter.matches(gift(backdrop="Red"))
+    assert not gift_filter.matches(gift(symbol="Star"))
+
+
+def test_any_term_within_group_matches():
+    gift_filter = GiftFilter(backgrounds=["Red", "Black"])
+    assert gift_filter.matches(gift(backdrop="Black"))
+    assert gift_filter.matches(gift(backdrop="Red"))
+    assert not gift_filter.matches(gift(backdrop="Blue"))
+
+
+def test_blacklisted_owner_never_matches():
+    gift_filter = GiftFilter(blacklist=["@Hidden_Owner"])
+    assert not gift_filter.matches(gift(owner="@hidden_owner"))
+    assert not gift_filter.matches(gift(owner="@HIDDEN_OWNER"))
+    assert gift_filter.matches(gift(owner="@someone_else"))
+
+
+def test_blacklist_wins_over_matching_attributes():
+    gift_filter = GiftFilter(models=["Ninja Mike"], blacklist=["@owner"])
+    assert not gift_filter.matches(gift())
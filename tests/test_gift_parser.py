@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from services.gift_parser import GiftRecord, extract_gift, has_gift_table
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+URL = "https://t.me/nft/PlushPepe-1337"
+
+
+def load(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_extracts_all_attributes():
+    record = extract_gift(URL, load("gift_page.html"))
+    assert record == GiftRecord(
+        url=URL, owner="@pepe_collector", model="Ninja Mike", backdrop="Ivory White", symbol="Illuminati")
+
+
+def test_rarity_mark_is_stripped():
+    record = extract_gift(URL, load("gift_page.html"))
+    for value in (record.model, record.backdrop, record.symbol):
+        assert "%" not in value
+        assert value == value.strip()
+
+
+def test_hidden_owner_has_no_record_but_has_table():
+    html_text = load("gift_hidden_owner.html")
+    assert extract_gift(URL, html_text) is None
+    assert has_gift_table(html_text)
+
+
+def test_missing_table():
+    html_text = load("gift_not_found.html")
+    assert extract_gift(URL, html_text) is None
+    assert not has_gift_table(html_text)
+
+
+@pytest.mark.parametrize("html_text", [
+    "",
+    '<table class="tgme_gift_table"><tr><th>Owner</th>',
+    '<table class="tgme_gift_table"><tr><th>Model</th><td>Ninja Mike</td></tr></table>',
+    '<table class="tgme_gift_table"><tr><th>Owner</th><td><a>no href</a></td></tr></table>',
+])
+def test_broken_or_incomplete_tables(html_text):
+    assert extract_gift(URL, html_text) is None
+
+
+def test_missing_optional_rows_are_empty():
+    html_text = (
+        '<table class="tgme_gift_table">'
+        '<tr><th>Owner</th><td><a href="https://t.me/someone">Someone</a></td></tr>'
+        '<tr><th>Model</th><td>Frogtor <mark>0.5%</mark></td></tr>'
+        '</table>'
+    )
+    assert extract_gift(URL, html_text) == GiftRecord(
+        url=URL, owner="@someone", model="Frogtor", backdrop="", symbol="")
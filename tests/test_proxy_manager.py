@@ -0,0 +1,52 @@
+import asyncio
+
+from services.proxy_manager import ProxyManager
+
+PROXIES = ["10.0.0.1:1080:user:pass", "10.0.0.2:1080:user:pass"]
+
+
+def make_manager() -> ProxyManager:
+    manager = ProxyManager(cooldown_seconds=10, max_cooldown_seconds=60, proxy_concurrency=10)
+    manager.set_proxies(PROXIES)
+    return manager
+
+
+def picks(manager: ProxyManager, count: int) -> set[str]:
+    async def scenario():
+        return {await manager.get_proxy() for _ in range(count)}
+
+    return asyncio.run(scenario())
+
+
+def test_failed_probe_with_cooldown_skips_proxy():
+    manager = make_manager()
+    manager.apply_probe(PROXIES[0], None, cooldown=300)
+    assert picks(manager, 10) == {PROXIES[1]}
+
+
+def test_failed_probe_without_cooldown_only_lowers_weight():
+    manager = make_manager()
+    manager.apply_probe(PROXIES[0], None)
+    assert picks(manager, 10) == set(PROXIES)
+    assert manager.states[PROXIES[0]].success_rate < manager.states[PROXIES[1]].success_rate
+
+
+def test_successful_probe_ends_cooldown():
+    manager = make_manager()
+    manager.apply_probe(PROXIES[0], None, cooldown=300)
+    manager.apply_probe(PROXIES[0], 0.2)
+    assert picks(manager, 10) == set(PROXIES)
+
+
+def test_selection_skips_proxy_with_full_limiter():
+    async def scenario():
+        manager = make_manager()
+        manager.proxy_concurrency = 1
+        async with manager.slot(PROXIES[0]):
+            picked = {await manager.get_proxy() for _ in range(10)}
+        return picked, await manager.get_proxy()
+
+    picked, after_release = asyncio.run(scenario())
+    assert picked == {PROXIES[1]}
+    # Пропущенный прокси не теряет очередь и выбирается первым, как только освободился.
+    assert after_release == PROXIES[0]
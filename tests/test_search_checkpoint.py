@@ -0,0 +1,37 @@
+import asyncio
+
+import database as db
+from services.gift_filter import GiftFilter
+from services.search_jobs import SearchJob, search_scheduler
+
+
+def make_job() -> SearchJob:
+    job = SearchJob(1, 1, "Plush Pepe", 1, 16, GiftFilter(), job_id=7)
+    job.mark_processed(1)
+    job.add_match("https://t.me/nft/PlushPepe-1", "@owner")
+    return job
+
+
+def test_failed_checkpoint_keeps_unsaved_state(monkeypatch):
+    async def failing_save(jobs, matches, finished_ids=()):
+        return False
+
+    monkeypatch.setattr(db, "save_search_checkpoints", failing_save)
+    job = make_job()
+    asyncio.run(search_scheduler.checkpoint([job]))
+    assert job.dirty
+    assert job.unsaved_found == [("https://t.me/nft/PlushPepe-1", "@owner")]
+
+
+def test_successful_checkpoint_clears_unsaved_state(monkeypatch):
+    saved = []
+
+    async def save(jobs, matches, finished_ids=()):
+        saved.append(matches)
+        return True
+
+    monkeypatch.setattr(db, "save_search_checkpoints", save)
+    job = make_job()
+    asyncio.run(search_scheduler.checkpoint([job]))
+    assert saved == [[(7, "https://t.me/nft/PlushPepe-1", "@owner")]]
+    assert not job.dirty and job.unsaved_found == []
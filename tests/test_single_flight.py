@@ -0,0 +1,51 @@
+import asyncio
+
+from services.single_flight import BatchFlight
+
+
+def test_overlapping_batches_fetch_each_key_once():
+    async def scenario():
+        flight = BatchFlight()
+        requested = []
+        release = asyncio.Event()
+
+        async def fetch(keys):
+            requested.append(list(keys))
+            await release.wait()
+            return {key: key * 10 for key in keys}
+
+        first = asyncio.create_task(flight.do([1, 2, 3], fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do([2, 3, 4], fetch))
+        await asyncio.sleep(0)
+        release.set()
+        return requested, await first, await second, flight
+
+    requested, first, second, flight = asyncio.run(scenario())
+    assert requested == [[1, 2, 3], [4]]
+    assert first == {1: 10, 2: 20, 3: 30}
+    assert second == {2: 20, 3: 30, 4: 40}
+    assert (flight.executed, flight.deduplicated, len(flight)) == (4, 2, 0)
+
+
+def test_keys_of_cancelled_batch_are_fetched_again():
+    async def scenario():
+        flight = BatchFlight()
+        requested = []
+
+        async def fetch(keys):
+            requested.append(list(keys))
+            if len(requested) == 1:
+                await asyncio.Event().wait()
+            return {key: key * 10 for key in keys}
+
+        first = asyncio.create_task(flight.do([1, 2], fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do([2, 3], fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return requested, await second
+
+    requested, second = asyncio.run(scenario())
+    assert requested == [[1, 2], [3], [2]]
+    assert second == {2: 20, 3: 30}
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import time
+
+import aiohttp
+
+from services.gift_fetcher import fetch_gift_page, fetch_limiter
+from services.http_client import http_client
+from services.proxy_manager import proxy_manager
+from services.worker_broker import TOKEN_ENV, limiter_report
+
+PROXY_REFRESH_INTERVAL = 60.0
+RETRY_DELAY = 5.0
+
+# Время последней примененной проверки каждого прокси, чтобы одну и ту же проверку не учитывать дважды.
+applied_checks: dict[str, float] = {}
+
+
+async def process_shard(slug: str, numbers: list[int]) -> list[list]:
+    pages = await asyncio.gather(*(fetch_gift_page(slug, number) for number in numbers))
+    results = []
+    for number, (status, record) in zip(numbers, pages):
+        if record is None:
+            results.append([number, status, None, None, None, None])
+        else:
+            results.append([number, status, record.owner, record.model, record.backdrop, record.symbol])
+    return results
+
+
+async def update_proxies(broker: aiohttp.ClientSession, url: str, worker_id: str):
+    try:
+        async with broker.get(f"{url}/proxies", params={"worker": worker_id}) as response:
+            response.raise_for_status()
+            body = await response.json()
+        proxies = body["proxies"]
+        if proxies != proxy_manager.proxies:
+            proxy_manager.set_proxies(proxies)
+            proxy_manager.seed_stats(body["stats"])
+            await http_client.close_unused(proxies)
+            logging.info(f"Получено {len(proxies)} прокси от бота.")
+        # Фоновые проверки прокси идут в боте; воркер применяет их так же, как сам бот, с оставшимся отдыхом.
+        for proxy, (checked_at, latency, cooldown) in body["checks"].items():
+            if checked_at > applied_checks.get(proxy, 0.0):
+                applied_checks[proxy] = checked_at
+                proxy_manager.apply_probe(proxy, latency, max(checked_at + cooldown - time.time(), 0.0))
+        proxy_manager.set_proxy_concurrency(body["limits"]["proxy"])
+        fetch_limiter.set_max_limit(body["limits"]["search"])
+    except Exception as e:
+        logging.error(f"Не удалось получить список прокси: {e}")
+
+
+async def refresh_proxies(broker: aiohttp.ClientSession, url: str, worker_id: str):
+    while True:
+        await asyncio.sleep(PROXY_REFRESH_INTERVAL)
+        await update_proxies(broker, url, worker_id)
+
+
+async def run_shards(broker: aiohttp.ClientSession, url: str, worker_id: str):
+    while True:
+        try:
+            async with broker.post(f"{url}/lease", json={"worker": worker_id}) as response:
+                response.raise_for_status()
+                shard = (await response.json())["shard"]
+            if shard is None:
+                continue
+            results = await process_shard(shard["slug"], shard["numbers"])
+            async with broker.post(
+                    f"{url}/complete",
+                    json={"worker": worker_id, "id": shard["id"], "results": results, "limits": limiter_report()}
+            ) as response:
+                response.raise_for_status()
+        except Exception as e:
+            logging.error(f"Ошибка связи с ботом: {e}")
+            await asyncio.sleep(RETRY_DELAY)
+
+
+async def main(url: str, token: str, worker_id: str, shards: int):
+    await http_client.start()
+    headers = {"Authorization": f"Bearer {token}"}
+    async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=None)) as broker:
+        logging.info(f"Воркер {worker_id} подключается к {url}...")
+        await update_proxies(broker, url, worker_id)
+        tasks = [asyncio.create_task(refresh_proxies(broker, url, worker_id))]
+        tasks += [asyncio.create_task(run_shards(broker, url, worker_id)) for _ in range(shards)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await http_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воркер проверки страниц подарков")
+    parser.add_argument("--broker", required=True, help="адрес бота, например http://10.0.0.1:8081")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV, ""), help=f"WORKER_TOKEN бота (или {TOKEN_ENV})")
+    parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--shards", type=int, default=2, help="сколько шардов обрабатывать одновременно")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    try:
+        asyncio.run(main(args.broker.rstrip("/"), args.token, args.id, args.shards))
+    except KeyboardInterrupt:
+        pass